@@ -84,7 +84,9 @@ def process_signature(app, what, name, obj, options, signature, return_annotatio
         if "create_env" not in signature:
             raise ValueError(f"Decorated mod {name} does not accept create_env")
         new_signature = signature.replace(
-            "create_env", "verbose=True, logfile=None, solver_params=None"
+            "create_env",
+            "verbose=True, logfile=None, solver_params=None, env_pool=None, "
+            "fast_build=False",
         )
         print(f"Modified signature of {name}")
         return new_signature, return_annotation
@@ -99,6 +101,10 @@ boilerplate = """
 :type logfile: :class:`str`
 :param solver_params: Gurobi parameters to be passed to the solver (optional)
 :type solver_params: :class:`dict`
+:param env_pool: Reuse Gurobi environments from the given pool instead of starting a new environment for each call (optional)
+:type env_pool: :class:`~gurobi_optimods.utils.EnvPool`
+:param fast_build: ``fast_build=True`` skips naming variables and constraints, which speeds up building large models (optional, defaults to ``False``)
+:type fast_build: :class:`bool`
 """
 boilerplate = boilerplate.strip().split("\n")
 
@@ -0,0 +1,111 @@
+"""
+Batch Solving
+-------------
+"""
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchResult:
+    """Outcome of solving a single instance in a batch. Exactly one of
+    ``result`` (the return value of the mod) or ``error`` (the exception
+    raised by the mod) is set."""
+
+    result: Any = None
+    error: Optional[Exception] = None
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+
+def _solve_instance(mod, instance, kwargs):
+    # Module level function, so that it can be sent to a process pool
+    if isinstance(instance, dict):
+        args, kwargs = (), {**kwargs, **instance}
+    elif isinstance(instance, tuple):
+        args = instance
+    else:
+        args = (instance,)
+    try:
+        return BatchResult(result=mod(*args, **kwargs))
+    except Exception as e:
+        return BatchResult(error=e)
+
+
+def solve_many(mod, inputs, workers=None, executor="thread", **kwargs):
+    """Solve many independent instances of an optimod in parallel.
+
+    Gurobi threads are divided between the workers, so that each instance is
+    solved using ``Threads = max(1, cpu_count // workers)``, unless the
+    ``Threads`` parameter is given explicitly through ``solver_params``. Console
+    output of the mods is disabled unless ``verbose=True`` is passed.
+
+    :param mod: The optimod to call, e.g.
+        :func:`~gurobi_optimods.mwis.maximum_weighted_independent_set`
+    :type mod: :class:`callable`
+    :param inputs: Instances to solve. Each instance is either a tuple of
+        positional arguments, a dict of keyword arguments, or a single argument
+        for ``mod``
+    :type inputs: :class:`list`
+    :param workers: Number of instances to solve in parallel (optional,
+        defaults to the number of CPUs)
+    :type workers: :class:`int`
+    :param executor: Run instances in a pool of ``"thread"`` or ``"process"``
+        workers. Process pools require ``mod``, its inputs and results to be
+        picklable
+    :type executor: :class:`str`
+    :param kwargs: Additional keyword arguments passed to every call of
+        ``mod``, for example ``solver_params`` or ``logfile``
+    :return: The result of each instance, in the same order as ``inputs``
+    :rtype: :class:`list` of :class:`BatchResult`
+    """
+    if not getattr(mod, "_decorated_mod", False):
+        raise TypeError(f"{mod!r} is not an optimod")
+
+    if executor == "thread":
+        executor_class = ThreadPoolExecutor
+    elif executor == "process":
+        executor_class = ProcessPoolExecutor
+    else:
+        raise ValueError(f"Unknown executor type: {executor}")
+
+    inputs = list(inputs)
+    cpu_count = os.cpu_count() or 1
+    if workers is None:
+        workers = cpu_count
+    workers = max(1, min(workers, len(inputs)))
+
+    kwargs.setdefault("verbose", False)
+    kwargs["solver_params"] = {
+        "Threads": max(1, cpu_count // workers),
+        **(kwargs.get("solver_params") or {}),
+    }
+
+    logger.info(
+        f"Solving {len(inputs)} instances of {mod.__name__} with {workers} "
+        f"{executor} workers"
+    )
+
+    with executor_class(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_solve_instance, mod, instance, kwargs) for instance in inputs
+        ]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                # Failures outside the mod, e.g. pickling errors
+                results.append(BatchResult(error=e))
+
+    logger.info(f"Solved {sum(r.success for r in results)} of {len(results)} instances")
+
+    return results
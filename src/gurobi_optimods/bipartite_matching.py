@@ -20,7 +20,7 @@ try:
 except ImportError:
     nx = None
 
-from gurobi_optimods.utils import optimod
+from gurobi_optimods.utils import names_enabled, optimod
 
 logger = logging.getLogger(__name__)
 
@@ -87,32 +87,30 @@ def _maximum_bipartite_matching_pandas(frame, n1_column, n2_column, create_env):
     """This implementation uses gurobipy-pandas, which suits the input data
     already in a pandas dataframe."""
 
+    names = names_enabled()
     with create_env() as env, gp.Model(env=env) as model:
-        df = (
-            pd.concat(
-                [
-                    frame.assign(_original_edge=True),
-                    pd.DataFrame(
-                        {
-                            n1_column: "source",
-                            n2_column: frame[n1_column].unique(),
-                            "_original_edge": False,
-                        }
-                    ),
-                    pd.DataFrame(
-                        {
-                            n1_column: frame[n2_column].unique(),
-                            n2_column: "sink",
-                            "_original_edge": False,
-                        }
-                    ),
-                ]
-            )
-            .set_index([n1_column, n2_column])
-            .gppd.add_vars(model, ub=1, name="flow")
-        )
+        df = pd.concat(
+            [
+                frame.assign(_original_edge=True),
+                pd.DataFrame(
+                    {
+                        n1_column: "source",
+                        n2_column: frame[n1_column].unique(),
+                        "_original_edge": False,
+                    }
+                ),
+                pd.DataFrame(
+                    {
+                        n1_column: frame[n2_column].unique(),
+                        n2_column: "sink",
+                        "_original_edge": False,
+                    }
+                ),
+            ]
+        ).set_index([n1_column, n2_column])
+        df["flow"] = gppd.add_vars(model, df, ub=1, name="flow" if names else None)
         df.loc[("sink", "source"), "flow"] = model.addVar(
-            obj=1, name="flow[sink,source]"
+            obj=1, name="flow[sink,source]" if names else ""
         )
         df.loc[("sink", "source"), "_original_edge"] = False
         model.ModelSense = GRB.MAXIMIZE
@@ -122,7 +120,7 @@ def _maximum_bipartite_matching_pandas(frame, n1_column, n2_column, create_env):
             df["flow"].groupby(n1_column).sum(),
             GRB.EQUAL,
             df["flow"].groupby(n2_column).sum(),
-            name="balance",
+            name="balance" if names else None,
         )
         model.optimize()
 
@@ -148,39 +146,48 @@ def _maximum_bipartite_matching_networkx(graph, nodes1, nodes2, create_env):
     # Treat all matching problems as undirected
     graph = graph.to_undirected()
 
+    names = names_enabled()
     with create_env() as env, gp.Model(env=env) as model:
         # Add variables for each layer of edges in the max flow graph
-        source_layer = {i: model.addVar(name=f"flow[source,{i}]", ub=1) for i in nodes1}
+        source_layer = {
+            i: model.addVar(name=f"flow[source,{i}]" if names else "", ub=1)
+            for i in nodes1
+        }
         graph_layer = {
-            (i, j): model.addVar(name=f"flow[{i},{j}]", ub=1)
+            (i, j): model.addVar(name=f"flow[{i},{j}]" if names else "", ub=1)
             for i, j in graph.edges
             if i in nodes1 and j in nodes2
         }
-        sink_layer = {j: model.addVar(name=f"flow[{j},sink]", ub=1) for j in nodes2}
-        sink_source = model.addVar(name="flow[sink,source]")
+        sink_layer = {
+            j: model.addVar(name=f"flow[{j},sink]" if names else "", ub=1)
+            for j in nodes2
+        }
+        sink_source = model.addVar(name="flow[sink,source]" if names else "")
 
         # At the source node, sink -> source flow balances source -> nodes1 flow
         model.addConstr(
-            gp.quicksum(source_layer.values()) == sink_source, name="source_balance"
+            gp.quicksum(source_layer.values()) == sink_source,
+            name="source_balance" if names else "",
         )
 
         # In the nodes1 layer, flows from source balance flows to nodes2
         for i in nodes1:
             model.addConstr(
                 source_layer[i] == gp.quicksum(graph_layer[i, j] for j in graph[i]),
-                name=f"n1_balance[{i}]",
+                name=f"n1_balance[{i}]" if names else "",
             )
 
         # In the nodes1 layer, flows from nodes2 balance flows to sink
         for j in nodes2:
             model.addConstr(
                 sink_layer[j] == gp.quicksum(graph_layer[i, j] for i in graph[j]),
-                name=f"n2_balance[{j}]",
+                name=f"n2_balance[{j}]" if names else "",
             )
 
         # At the sink node, sink -> source flow balances nodes2 -> sink flow
         model.addConstr(
-            gp.quicksum(sink_layer.values()) == sink_source, name="sink_balance"
+            gp.quicksum(sink_layer.values()) == sink_source,
+            name="sink_balance" if names else "",
         )
 
         # Maximize flow through the uncapacitated sink->source edge
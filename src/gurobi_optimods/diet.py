@@ -10,7 +10,7 @@ from gurobipy import GRB
 import gurobipy_pandas as gppd
 import pandas as pd
 
-from gurobi_optimods.utils import optimod
+from gurobi_optimods.utils import names_enabled, optimod
 
 
 @dataclass
@@ -32,21 +32,35 @@ def solve_diet_problem(categories, foods, values, *, create_env):
     :param values: Dataframe with columns (food, category, value)
     :type values: pd.DataFrame
     """
+    names = names_enabled()
     with create_env() as env, gp.Model(env=env) as model:
         # Build the model
         quantity = gppd.add_vars(
-            model, foods.set_index("food"), obj="cost", name="quantity"
-        )
+            model,
+            foods.set_index("food"),
+            obj="cost",
+            name="quantity" if names else None,
+        ).rename("quantity")
         amounts = (
             values.join(quantity, on="food")
             .assign(amount=lambda df: df["value"] * df["quantity"])
             .groupby("category")["amount"]
             .sum()
         )
-        (
-            categories.join(amounts, on="category")
-            .gppd.add_constrs(model, "amount >= min", name="lower")
-            .gppd.add_constrs(model, "amount <= max", name="upper")
+        limits = categories.join(amounts, on="category")
+        gppd.add_constrs(
+            model,
+            limits["amount"],
+            GRB.GREATER_EQUAL,
+            limits["min"],
+            name="lower" if names else None,
+        )
+        gppd.add_constrs(
+            model,
+            limits["amount"],
+            GRB.LESS_EQUAL,
+            limits["max"],
+            name="upper" if names else None,
         )
         # Solve, post-process and return solution
         model.optimize()
@@ -17,13 +17,19 @@ try:
 except ImportError:
     nx = None
 
-from gurobi_optimods.utils import optimod
+from gurobi_optimods.utils import names_enabled, optimod
 
 logger = logging.getLogger(__name__)
 
 
 @optimod()
-def min_cost_flow(arc_data: pd.DataFrame, demand_data: pd.DataFrame, *, create_env):
+def min_cost_flow(
+    arc_data: pd.DataFrame,
+    demand_data: pd.DataFrame,
+    *,
+    backend="gurobi",
+    create_env,
+):
     """Solve the minimum cost flow problem for a given graph.
 
     The inputs adhere to the following structure::
@@ -47,27 +53,62 @@ def min_cost_flow(arc_data: pd.DataFrame, demand_data: pd.DataFrame, *, create_e
         include indexed by `"node"`, and include the `"demand"`. This value can
         be positive (requesting flow) or negative (supplying flow).
     :type demand_data: :class:`pd.DataFrame`
+    :param backend: ``"gurobi"`` (default) solves the problem as an LP with
+        Gurobi, ``"network_simplex"`` with a network simplex implementation
+        which does not use Gurobi.
+    :type backend: :class:`str`, optional
     :return: Cost of the minimum cost flow.
     :rtype: :class:`float`
     :return: DataFrame with the flow for each edge.
     :rtype: :class:`pd.Series`
     """
+    _check_backend(backend)
+    if backend == "network_simplex":
+        source_label, target_label = arc_data.index.names
+        sources = arc_data.index.get_level_values(source_label)
+        targets = arc_data.index.get_level_values(target_label)
+        nodes = sources.unique().union(targets.unique()).union(demand_data.index)
+        demands = demand_data["demand"].reindex(nodes, fill_value=0)
+        logger.info(
+            f"Solving min-cost flow with {len(nodes)} nodes and "
+            f"{len(arc_data)} edges"
+        )
+        cost, flow = _network_simplex(
+            nodes.get_indexer(sources),
+            nodes.get_indexer(targets),
+            arc_data["capacity"].to_numpy(),
+            arc_data["cost"].to_numpy(),
+            demands.to_numpy(),
+        )
+        return cost, pd.Series(flow, index=arc_data.index, name="flow")
+
+    names = names_enabled()
     with create_env() as env, gp.Model(env=env) as model:
         model.ModelSense = GRB.MINIMIZE
 
-        arc_df = arc_data.gppd.add_vars(model, ub="capacity", obj="cost", name="flow")
+        flow = gppd.add_vars(
+            model,
+            arc_data,
+            ub="capacity",
+            obj="cost",
+            name="flow" if names else None,
+        )
 
         source_label, target_label = arc_data.index.names
-        balance_df = (
-            pd.DataFrame(
-                {
-                    "inflow": arc_df["flow"].groupby(target_label).sum(),
-                    "outflow": arc_df["flow"].groupby(source_label).sum(),
-                    "demand": demand_data["demand"],
-                }
-            )
-            .fillna(0)  # zero fill (some nodes have no in, out, or demand)
-            .gppd.add_constrs(model, "inflow - outflow == demand", name="balance")
+        # zero fill (some nodes have no in, out, or demand)
+        balance_df = pd.DataFrame(
+            {
+                "inflow": flow.groupby(target_label).sum(),
+                "outflow": flow.groupby(source_label).sum(),
+                "demand": demand_data["demand"],
+            }
+        ).fillna(0)
+        gppd.add_constrs(
+            model,
+            balance_df["inflow"] - balance_df["outflow"],
+            GRB.EQUAL,
+            balance_df["demand"],
+            name="balance" if names else None,
         )
         logger.info(
             f"Solving min-cost flow with {len(balance_df)} nodes and "
@@ -78,7 +119,7 @@ def min_cost_flow(arc_data: pd.DataFrame, demand_data: pd.DataFrame, *, create_e
         if model.Status in [GRB.INFEASIBLE, GRB.INF_OR_UNBD]:
             raise ValueError("Unsatisfiable flows")
 
-        return model.ObjVal, arc_df["flow"].gppd.X
+        return model.ObjVal, flow.gppd.X.rename("flow")
 
 
 @optimod()
@@ -88,6 +129,7 @@ def min_cost_flow_scipy(
     costs: sp.spmatrix,
     demands: np.ndarray,
     *,
+    backend="gurobi",
     create_env,
 ):
     """Solve the minimum cost flow problem for a given graph.
@@ -100,11 +142,16 @@ def min_cost_flow_scipy(
     :type costs: :class:`sp.sparray`
     :param demands: Array containing the demand for each node.
     :type demands: :class:`np.ndarray`
+    :param backend: ``"gurobi"`` (default) solves the problem as an LP with
+        Gurobi, ``"network_simplex"`` with a network simplex implementation
+        which does not use Gurobi.
+    :type backend: :class:`str`, optional
     :return: Cost of the minimum cost flow.
     :rtype: :class:`float`
     :return: Adjacency matrix with flow in the solution
     :rtype: :class:`sp.sparray`
     """
+    _check_backend(backend)
     G = G.tocoo()
 
     edge_source = G.row
@@ -116,85 +163,434 @@ def min_cost_flow_scipy(
     costs = costs.tocoo()
     costs = costs.data
 
-    # Create incidence matrix from edge lists.
-    indices = np.column_stack((edge_source, edge_target)).reshape(-1, order="C")
-    indptr = np.arange(0, 2 * edge_source.shape[0] + 2, 2)
-    ones = np.ones(edge_source.shape)
-    data = np.column_stack((ones * -1.0, ones)).reshape(-1, order="C")
-
-    A = sp.csc_array((data, indices, indptr))
-
-    logger.info("Solving min-cost flow with {0} nodes and {1} edges".format(*A.shape))
-
-    # Solve model with gurobi, return cost and flows
-    with create_env() as env, gp.Model(env=env) as model:
-        x = model.addMVar(A.shape[1], lb=0, obj=costs, name="x")
-        model.addConstr(x <= capacities, name="capacity")
-        model.addMConstr(A, x, GRB.EQUAL, demands, name="flow")
-        model.optimize()
-        if model.Status in [GRB.INFEASIBLE, GRB.INF_OR_UNBD]:
-            raise ValueError("Unsatisfiable flows")
-        # Filter + create scipy output matrix
-        select = x.X > 0.5
-        edge_source_result = edge_source[select]
-        edge_target_result = edge_target[select]
-        arg = (x.X[select], (edge_source_result, edge_target_result))
-        return model.ObjVal, sp.coo_matrix(arg, dtype=float, shape=G.shape)
+    logger.info(
+        f"Solving min-cost flow with {len(demands)} nodes and "
+        f"{len(edge_source)} edges"
+    )
+    if backend == "network_simplex":
+        cost, flow = _network_simplex(
+            edge_source, edge_target, capacities, costs, demands
+        )
+        select = flow > 0.5
+        arg = (flow[select], (edge_source[select], edge_target[select]))
+        return cost, sp.coo_matrix(arg, dtype=float, shape=G.shape)
+
+    names = names_enabled()
+    cost, flow = _min_cost_flow_arrays(
+        edge_source,
+        edge_target,
+        capacities,
+        costs,
+        demands,
+        create_env=create_env,
+        capacity_rows=True,
+        var_names="x" if names else None,
+        constr_names="flow" if names else None,
+        capacity_names="capacity" if names else None,
+    )
+    # Filter + create scipy output matrix
+    select = flow > 0.5
+    arg = (flow[select], (edge_source[select], edge_target[select]))
+    return cost, sp.coo_matrix(arg, dtype=float, shape=G.shape)
 
 
 @optimod()
-def min_cost_flow_networkx(G, *, create_env):
+def min_cost_flow_networkx(G, *, backend="gurobi", create_env):
     """Solve the minimum cost flow problem for a given graph.
 
-    Note: We assume the networkx input graph node labels are all integers.
-
     :param G: Graph with edge attributes ``capacity`` and ``cost``, as well as
         node attributes ``demand``.
     :type G: :class:`nx.DiGraph`
+    :param backend: ``"gurobi"`` (default) solves the problem as an LP with
+        Gurobi, ``"network_simplex"`` with a network simplex implementation
+        which does not use Gurobi.
+    :type backend: :class:`str`, optional
     :return: Cost of the minimum cost flow.
     :rtype: :class:`float`
     :return: Dictionary indexed by edges with non-zero flow in the solution.
     :rtype: :class:`dict`
     """
+    _check_backend(backend)
     logger.info(
         f"Solving min-cost flow with {len(G.nodes)} nodes and {len(G.edges)} edges"
     )
 
-    with create_env() as env, gp.Model(env=env) as model:
-        edges, capacities, costs = gp.multidict(
-            {(i, j): [d["capacity"], d["cost"]] for i, j, d in G.edges(data=True)}
+    # Convert the graph into arrays indexed by position in G.nodes and G.edges
+    nodes = list(G.nodes(data="demand"))
+    edges = list(G.edges())
+    index = {n: k for k, n in enumerate(G)}
+    edge_count = len(edges)
+    edge_source = np.fromiter((index[i] for i, _ in edges), np.int64, edge_count)
+    edge_target = np.fromiter((index[j] for _, j in edges), np.int64, edge_count)
+    capacities = np.fromiter(
+        (c for _, _, c in G.edges(data="capacity")), float, edge_count
+    )
+    costs = np.fromiter((c for _, _, c in G.edges(data="cost")), float, edge_count)
+    demands = np.fromiter((d for _, d in nodes), float, len(nodes))
+
+    if backend == "network_simplex":
+        cost, flow = _network_simplex(
+            edge_source, edge_target, capacities, costs, demands
+        )
+    else:
+        names = names_enabled()
+        cost, flow = _min_cost_flow_arrays(
+            edge_source,
+            edge_target,
+            capacities,
+            costs,
+            demands,
+            create_env=create_env,
+            var_names=[f"flow[{i},{j}]" for i, j in edges] if names else None,
+            constr_names=[f"flow_balance[{n}]" for n, _ in nodes] if names else None,
         )
-        nodes = list(G.nodes(data=True))
-        x = {
-            (i, j): model.addVar(
-                name=f"flow[{i},{j}]",
-                ub=capacities[i, j],
-                obj=costs[i, j],
-            )
-            for i, j in edges
-        }
-
-        flow_constrs = {}
-        for n, data in nodes:
-            flow_constrs[n] = model.addConstr(
-                (
-                    gp.quicksum(x[j, n] for j in G.predecessors(n))
-                    - gp.quicksum(x[n, j] for j in G.successors(n))
-                    == data["demand"]
-                ),
-                name=f"flow_balance[{n}]",
-            )
 
-        model.optimize()
+    # Create a new Graph with the edges carrying flow
+    resulting_flow = nx.DiGraph()
+    resulting_flow.add_nodes_from(G.nodes(data=True))
+    resulting_flow.add_edges_from(
+        (*edges[k], {"flow": flow[k]}) for k in np.flatnonzero(flow > 0.1)
+    )
 
+    return cost, resulting_flow
+
+
+def _min_cost_flow_arrays(
+    edge_source,
+    edge_target,
+    capacities,
+    costs,
+    demands,
+    *,
+    create_env,
+    capacity_rows=False,
+    var_names=None,
+    constr_names=None,
+    capacity_names=None,
+):
+    """Solve the minimum cost flow problem on arc arrays with Gurobi. Nodes
+    are numbered ``0 .. n-1`` following ``demands``. Capacities are variable
+    bounds, or constraint rows ahead of the flow balance rows if
+    ``capacity_rows`` is set. Returns the cost and the flow on each arc."""
+    # Create incidence matrix from edge lists.
+    indices = np.column_stack((edge_source, edge_target)).reshape(-1, order="C")
+    indptr = np.arange(0, 2 * edge_source.shape[0] + 2, 2)
+    ones = np.ones(edge_source.shape)
+    data = np.column_stack((ones * -1.0, ones)).reshape(-1, order="C")
+
+    A = sp.csc_array((data, indices, indptr), shape=(len(demands), len(edge_source)))
+
+    # Solve model with gurobi, return cost and flows
+    with create_env() as env, gp.Model(env=env) as model:
+        if capacity_rows:
+            x = model.addMVar(A.shape[1], lb=0, obj=costs, name=var_names)
+            model.addConstr(x <= capacities, name=capacity_names)
+        else:
+            x = model.addMVar(
+                A.shape[1], lb=0, ub=capacities, obj=costs, name=var_names
+            )
+        model.addMConstr(A, x, GRB.EQUAL, demands, name=constr_names)
+        model.optimize()
         if model.Status in [GRB.INFEASIBLE, GRB.INF_OR_UNBD]:
             raise ValueError("Unsatisfiable flows")
+        return model.ObjVal, x.X
+
+
+def _check_backend(backend):
+    if backend not in ("gurobi", "network_simplex"):
+        raise ValueError(f"Unknown backend: {backend}")
 
-        # Create a new Graph with selected edges in the matching
-        resulting_flow = nx.DiGraph()
-        resulting_flow.add_nodes_from(nodes)
-        resulting_flow.add_edges_from(
-            [(edge[0], edge[1], {"flow": v.X}) for edge, v in x.items() if v.X > 0.1]
+
+def _network_simplex(sources, targets, capacities, costs, demands):
+    """Solve a minimum cost flow problem with the primal network simplex
+    method, without Gurobi.
+
+    Nodes are numbered ``0 .. n-1`` and the flow into each node minus the
+    flow out of it must equal its demand. Returns the cost of the flow and
+    the flow on each arc. Raises a ValueError if no flow satisfies the
+    demands, or if a negative cost cycle has infinite capacity.
+    """
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    capacities = np.asarray(capacities, dtype=float)
+    costs = np.asarray(costs, dtype=float)
+    demands = np.asarray(demands, dtype=float)
+
+    if not np.isclose(demands.sum(), 0.0):
+        raise ValueError("Unsatisfiable flows")
+
+    # Self loops carry their full capacity if it pays off, and neither they
+    # nor arcs without capacity ever enter the spanning tree
+    flow = np.zeros(sources.size)
+    loops = sources == targets
+    negative_loops = loops & (costs < 0)
+    flow[negative_loops] = capacities[negative_loops]
+    active = np.flatnonzero(~loops & (capacities > 0))
+
+    simplex = _NetworkSimplex(
+        sources[active], targets[active], capacities[active], costs[active], demands
+    )
+    simplex.solve()
+    flow[active] = simplex.flow[: active.size]
+
+    # Only report unbounded self loops once the demands are known to be
+    # satisfiable
+    if np.isinf(flow).any():
+        raise ValueError("Unbounded flows")
+
+    return float(costs @ flow), flow
+
+
+class _NetworkSimplex:
+    """Primal network simplex on arc arrays, following the spanning tree
+    data structures of :func:`networkx.network_simplex` (parent pointers,
+    subtree sizes and a depth-first thread), with block pricing and cycle
+    updates done on NumPy arrays.
+
+    An artificial root node ``n`` is connected to every node by an arc of
+    very high cost, which carries the node's demand in the initial feasible
+    spanning tree. The strongly feasible leaving arc rule prevents cycling.
+    """
+
+    def __init__(self, sources, targets, capacities, costs, demands):
+        n = demands.size
+        m = sources.size
+        root = n
+
+        finite = capacities[np.isfinite(capacities)]
+        faux_inf = 3 * max(
+            finite.sum(), np.abs(costs).sum(), np.abs(demands).sum(), 1.0
         )
 
-        return model.ObjVal, resulting_flow
+        # Arcs from nodes with demand to the root point towards the node
+        supplied = demands > 0
+        nodes = np.arange(n)
+        self.sources = np.concatenate([sources, np.where(supplied, root, nodes)])
+        self.targets = np.concatenate([targets, np.where(supplied, nodes, root)])
+        self.capacities = np.concatenate(
+            [
+                np.where(np.isfinite(capacities), capacities, faux_inf),
+                np.full(n, faux_inf),
+            ]
+        )
+        self.costs = np.concatenate([costs, np.full(n, faux_inf)])
+        self.flow = np.concatenate([np.zeros(m), np.abs(demands)])
+        self.potentials = np.append(np.where(supplied, -faux_inf, faux_inf), 0.0)
+        self.arc_count = m
+        self.faux_inf = faux_inf
+        self.tolerance = 1e-12 * faux_inf
+
+        # Spanning tree of artificial arcs: every node is a child of the root
+        self.parent = [root] * n + [None]
+        self.parent_arc = list(range(m, m + n)) + [None]
+        self.subtree_size = [1] * n + [n + 1]
+        self.next_node = list(range(1, n)) + [root, 0]
+        self.prev_node = [root] + list(range(n - 1)) + [n - 1]
+        self.last_descendant = list(range(n)) + [n - 1]
+
+    def solve(self):
+        for i in self._entering_arcs():
+            self._pivot(i)
+
+        if (self.flow[self.arc_count :] > self.tolerance).any():
+            raise ValueError("Unsatisfiable flows")
+        if (2 * self.flow[: self.arc_count] >= self.faux_inf).any():
+            raise ValueError("Unbounded flows")
+
+    def _entering_arcs(self):
+        """Yield arcs with a negative reduced cost (in the direction in which
+        their flow can change) until none are left. Arcs are priced in
+        blocks, taking the most negative arc of the first block which has
+        one."""
+        m = self.arc_count
+        if m == 0:
+            return
+        block_size = int(np.ceil(np.sqrt(m)))
+        block_count = (m + block_size - 1) // block_size
+        offsets = np.arange(block_size)
+        first = 0
+        blocks_without_entering = 0
+        while blocks_without_entering < block_count:
+            block = (first + offsets) % m
+            first = (first + block_size) % m
+            reduced = (
+                self.costs[block]
+                - self.potentials[self.sources[block]]
+                + self.potentials[self.targets[block]]
+            )
+            reduced[self.flow[block] != 0] *= -1
+            k = reduced.argmin()
+            if reduced[k] >= -self.tolerance:
+                blocks_without_entering += 1
+            else:
+                blocks_without_entering = 0
+                yield block[k]
+
+    def _pivot(self, i):
+        if self.flow[i] == 0:
+            p, q = self.sources[i], self.targets[i]
+        else:
+            p, q = self.targets[i], self.sources[i]
+        cycle_nodes, cycle_arcs = self._find_cycle(i, p, q)
+
+        # Residual capacity of each cycle arc in the direction of the cycle;
+        # the last arc with minimum residual capacity leaves
+        arcs = np.array(cycle_arcs)
+        forward = self.sources[arcs] == np.array(cycle_nodes)
+        residual = np.where(
+            forward, self.capacities[arcs] - self.flow[arcs], self.flow[arcs]
+        )
+        k = residual.size - 1 - residual[::-1].argmin()
+        self.flow[arcs] += np.where(forward, residual[k], -residual[k])
+
+        j = cycle_arcs[k]
+        if i == j:
+            return
+        s = cycle_nodes[k]
+        t = self.targets[j] if forward[k] else self.sources[j]
+        if self.parent[t] != s:
+            # Ensure that s is the parent of t
+            s, t = t, s
+        if cycle_arcs.index(i) > k:
+            # Ensure that q is in the subtree rooted at t
+            p, q = q, p
+        self._remove_arc(s, t)
+        self._make_root(q)
+        self._add_arc(i, p, q)
+        self._update_potentials(i, p, q)
+
+    def _find_apex(self, p, q):
+        """Lowest common ancestor of nodes p and q in the spanning tree"""
+        size_p = self.subtree_size[p]
+        size_q = self.subtree_size[q]
+        while True:
+            while size_p < size_q:
+                p = self.parent[p]
+                size_p = self.subtree_size[p]
+            while size_p > size_q:
+                q = self.parent[q]
+                size_q = self.subtree_size[q]
+            if size_p == size_q:
+                if p != q:
+                    p = self.parent[p]
+                    size_p = self.subtree_size[p]
+                    q = self.parent[q]
+                    size_q = self.subtree_size[q]
+                else:
+                    return p
+
+    def _trace_path(self, p, w):
+        """Nodes and arcs on the tree path from node p up to its ancestor w"""
+        nodes = [p]
+        arcs = []
+        while p != w:
+            arcs.append(self.parent_arc[p])
+            p = self.parent[p]
+            nodes.append(p)
+        return nodes, arcs
+
+    def _find_cycle(self, i, p, q):
+        """Nodes and arcs on the cycle created by adding arc i = (p, q) to the
+        spanning tree, oriented from p to q. Each arc is paired with the node
+        at which the cycle enters it."""
+        w = self._find_apex(p, q)
+        nodes, arcs = self._trace_path(p, w)
+        nodes.reverse()
+        arcs.reverse()
+        arcs.append(i)
+        nodes_q, arcs_q = self._trace_path(q, w)
+        del nodes_q[-1]
+        return nodes + nodes_q, arcs + arcs_q
+
+    def _subtree(self, p):
+        """Nodes in the subtree rooted at node p"""
+        nodes = [p]
+        last = self.last_descendant[p]
+        while p != last:
+            p = self.next_node[p]
+            nodes.append(p)
+        return nodes
+
+    def _remove_arc(self, s, t):
+        """Remove the tree arc between node t and its parent s"""
+        size_t = self.subtree_size[t]
+        prev_t = self.prev_node[t]
+        last_t = self.last_descendant[t]
+        next_last_t = self.next_node[last_t]
+        self.parent[t] = None
+        self.parent_arc[t] = None
+        # Remove the subtree rooted at t from the thread
+        self.next_node[prev_t] = next_last_t
+        self.prev_node[next_last_t] = prev_t
+        self.next_node[last_t] = t
+        self.prev_node[t] = last_t
+        # Update the (old) ancestors of t
+        while s is not None:
+            self.subtree_size[s] -= size_t
+            if self.last_descendant[s] == last_t:
+                self.last_descendant[s] = prev_t
+            s = self.parent[s]
+
+    def _make_root(self, q):
+        """Make node q the root of its subtree"""
+        ancestors = []
+        while q is not None:
+            ancestors.append(q)
+            q = self.parent[q]
+        ancestors.reverse()
+        for p, q in zip(ancestors, ancestors[1:]):
+            size_p = self.subtree_size[p]
+            last_p = self.last_descendant[p]
+            prev_q = self.prev_node[q]
+            last_q = self.last_descendant[q]
+            next_last_q = self.next_node[last_q]
+            # Make p a child of q
+            self.parent[p] = q
+            self.parent[q] = None
+            self.parent_arc[p] = self.parent_arc[q]
+            self.parent_arc[q] = None
+            self.subtree_size[p] = size_p - self.subtree_size[q]
+            self.subtree_size[q] = size_p
+            # Remove the subtree rooted at q from the thread
+            self.next_node[prev_q] = next_last_q
+            self.prev_node[next_last_q] = prev_q
+            self.next_node[last_q] = q
+            self.prev_node[q] = last_q
+            if last_p == last_q:
+                self.last_descendant[p] = prev_q
+                last_p = prev_q
+            # Append the rest of the subtree of p to the subtree of q
+            self.prev_node[p] = last_q
+            self.next_node[last_q] = p
+            self.next_node[last_p] = q
+            self.prev_node[q] = last_p
+            self.last_descendant[q] = last_p
+
+    def _add_arc(self, i, p, q):
+        """Add arc i between node p and the root q of a subtree to the tree"""
+        last_p = self.last_descendant[p]
+        next_last_p = self.next_node[last_p]
+        size_q = self.subtree_size[q]
+        last_q = self.last_descendant[q]
+        self.parent[q] = p
+        self.parent_arc[q] = i
+        # Insert the subtree rooted at q into the thread after p's subtree
+        self.next_node[last_p] = q
+        self.prev_node[q] = last_p
+        self.prev_node[next_last_p] = last_q
+        self.next_node[last_q] = next_last_p
+        # Update the (new) ancestors of q
+        while p is not None:
+            self.subtree_size[p] += size_q
+            if self.last_descendant[p] == last_p:
+                self.last_descendant[p] = last_q
+            p = self.parent[p]
+
+    def _update_potentials(self, i, p, q):
+        """Shift the potentials of the subtree rooted at q, attached to its
+        parent p by arc i, so that arc i has zero reduced cost"""
+        if q == self.targets[i]:
+            shift = self.potentials[p] - self.costs[i] - self.potentials[q]
+        else:
+            shift = self.potentials[p] + self.costs[i] - self.potentials[q]
+        self.potentials[self._subtree(q)] += shift
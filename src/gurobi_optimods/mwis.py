@@ -3,39 +3,416 @@ Maximum Weighted Independent Set
 --------------------------------
 """
 
+import contextvars
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
 
 import gurobipy as gp
 from gurobipy import GRB
 
-from gurobi_optimods.utils import optimod
+from gurobi_optimods.utils import names_enabled, optimod
+
+logger = logging.getLogger(__name__)
 
 
 @optimod()
-def maximum_weighted_independent_set(adjacency_matrix, weights, *, create_env):
+def maximum_weighted_independent_set(
+    adjacency_matrix,
+    weights,
+    *,
+    formulation="edge",
+    warm_start=True,
+    heuristic_only=False,
+    decompose=True,
+    workers=1,
+    create_env,
+):
     """Find a set of mutually non-adjacent vertices with maximum weighted sum.
 
-    :param adjacency_matrix: The upper triangular adjacency matrix.
+    :param adjacency_matrix: The adjacency matrix. Each edge may be given in
+        one direction only (e.g. an upper triangular matrix) or in both
+        directions (a symmetric matrix). Self-loops are ignored.
     :type adjacency_matrix: :class:`sp.sparray`
     :param weights: Vertex weight array.
     :type weights: :class:`np.array`
+    :param formulation: Either ``"edge"`` (one constraint per edge) or
+        ``"clique"`` (one constraint per clique in a greedily computed clique
+        cover of the edges, which gives a smaller model with a stronger
+        relaxation on dense graphs).
+    :type formulation: :class:`str`
+    :param warm_start: Pass an independent set found by a fast greedy and
+        local search heuristic to Gurobi as a starting solution.
+    :type warm_start: :class:`bool`
+    :param heuristic_only: Return the independent set found by the heuristic
+        without solving the model. The result is not necessarily optimal.
+    :type heuristic_only: :class:`bool`
+    :param decompose: Solve each connected component of the graph separately.
+        Components which are cliques (including isolated vertices and single
+        edges) are solved directly, without calling Gurobi.
+    :type decompose: :class:`bool`
+    :param workers: Number of threads used to solve components in parallel
+        if ``decompose=True``. Gurobi threads are divided between the
+        workers, unless the ``Threads`` parameter is given explicitly through
+        ``solver_params``.
+    :type workers: :class:`int`
     :return: The maximum weighted independent set array.
     :rtype: :class:`np.array`
     """
-    with create_env() as env, gp.Model("mwis", env=env) as model:
-        # x_i: 1 if vertex i is in the independent set and 0 otherwise
-        x = model.addMVar(len(weights), vtype=GRB.BINARY, name="x")
-        # Maximize the sum of the vertex weights in the independent set
-        model.setObjective(weights @ x, sense=GRB.MAXIMIZE)
-        # The independent set contains non-adjacent vertices
-        model.addConstrs(
-            (
-                x[i] + x[j] <= 1
-                for i, j in zip(
-                    adjacency_matrix.tocoo().row, adjacency_matrix.tocoo().col
+    weights = np.asarray(weights)
+    num_vertices = len(weights)
+    if adjacency_matrix.shape != (num_vertices, num_vertices):
+        raise ValueError(
+            f"Adjacency matrix of shape {adjacency_matrix.shape} does not match "
+            f"{num_vertices} weights"
+        )
+    if formulation not in ["edge", "clique"]:
+        raise ValueError(f"Unknown formulation: {formulation}")
+
+    adjacency = _symmetric_adjacency(adjacency_matrix)
+
+    if warm_start or heuristic_only:
+        heuristic = _heuristic_independent_set(adjacency, weights)
+        logger.info(
+            "Heuristic found an independent set with weight "
+            f"{weights[heuristic].sum()}"
+        )
+        if heuristic_only:
+            return np.flatnonzero(heuristic)
+
+    selected = np.zeros(num_vertices, dtype=bool)
+    if decompose:
+        components, position = _decompose(adjacency, weights, selected)
+    else:
+        components, position = [np.arange(num_vertices)], np.arange(num_vertices)
+
+    args = (
+        adjacency,
+        position,
+        weights,
+        formulation,
+        heuristic if warm_start else None,
+        create_env,
+    )
+    workers = min(workers, len(components))
+    if workers > 1:
+        # Solve groups of components in separate threads. Each thread runs
+        # in a copy of the current context to keep the call's log routing.
+        # Parameters passed to create_env are overridden by solver_params.
+        params = {"Threads": max(1, (os.cpu_count() or 1) // workers)}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(
+                    contextvars.copy_context().run,
+                    _solve_components,
+                    components[i::workers],
+                    *args,
+                    params=params,
+                )
+                for i in range(workers)
+            ]
+            solutions = [vertices for f in futures for vertices in f.result()]
+    elif components:
+        solutions = _solve_components(components, *args)
+    else:
+        # Every component is a clique, so no model needs to be solved
+        solutions = []
+
+    for vertices in solutions:
+        selected[vertices] = True
+    return np.flatnonzero(selected)
+
+
+def _decompose(adjacency, weights, selected):
+    """Split the graph into connected components. Components which are
+    cliques are solved directly by selecting their heaviest vertex (marked in
+    ``selected``). Returns the vertex arrays of the remaining components, and
+    the position of each vertex within its component."""
+    num_components, labels = connected_components(adjacency, directed=False)
+    sizes = np.bincount(labels, minlength=num_components)
+    num_edges = np.bincount(
+        labels, weights=np.diff(adjacency.indptr), minlength=num_components
+    )
+    starts = np.cumsum(sizes) - sizes
+
+    # Solve clique components by picking the heaviest vertex, if its weight
+    # is positive
+    is_clique = num_edges == sizes * (sizes - 1)
+    by_weight = np.lexsort((-weights, labels))
+    heaviest = by_weight[starts[is_clique]]
+    selected[heaviest[weights[heaviest] > 0]] = True
+
+    # Group the vertices by component, in index order so that the indices of
+    # the extracted subgraphs stay sorted
+    by_index = np.argsort(labels, kind="stable")
+    position = np.empty(labels.size, dtype=np.int64)
+    position[by_index] = np.arange(labels.size) - np.repeat(starts, sizes)
+    components = [
+        by_index[starts[c] : starts[c] + sizes[c]] for c in np.flatnonzero(~is_clique)
+    ]
+
+    logger.info(
+        f"Graph has {num_components} connected components, {len(components)} "
+        "of which require solving a model"
+    )
+    return components, position
+
+
+def _solve_components(
+    components,
+    adjacency,
+    position,
+    weights,
+    formulation,
+    start,
+    create_env,
+    params=None,
+):
+    """Solve the model for the subgraph induced by each of the given vertex
+    arrays, returning the selected vertices of each. ``params`` are passed to
+    ``create_env``."""
+    solutions = []
+    names = names_enabled()
+    with create_env(params) as env:
+        for vertices in components:
+            # Relabel the vertices of the subgraph to 0, ..., len(vertices) - 1
+            rows = adjacency[vertices]
+            subgraph = sp.csr_array(
+                (rows.data, position[rows.indices], rows.indptr),
+                shape=(len(vertices), len(vertices)),
+            )
+
+            if formulation == "edge":
+                edges = sp.triu(subgraph, k=1, format="coo")
+                cliques = np.column_stack([edges.row, edges.col])
+            else:
+                cliques = _clique_cover(subgraph)
+
+            with gp.Model("mwis", env=env) as model:
+                # x_i: 1 if vertex i is in the independent set and 0 otherwise
+                x = model.addMVar(
+                    len(vertices), vtype=GRB.BINARY, name="x" if names else None
+                )
+                # Maximize the sum of the vertex weights in the independent set
+                model.setObjective(weights[vertices] @ x, sense=GRB.MAXIMIZE)
+                # The independent set contains at most one vertex of each edge
+                # (or clique)
+                clique_matrix = _clique_incidence_matrix(cliques, len(vertices))
+                model.addMConstr(
+                    clique_matrix,
+                    x,
+                    GRB.LESS_EQUAL,
+                    np.ones(clique_matrix.shape[0]),
+                    name="no_adjacent_vertices" if names else None,
                 )
-            ),
-            name="no_adjacent_vertices",
+                if start is not None:
+                    x.Start = start[vertices]
+                model.optimize()
+                solutions.append(vertices[x.X >= 0.5])
+
+    return solutions
+
+
+def _clique_incidence_matrix(cliques, num_vertices):
+    """Build the sparse matrix with one row per clique, with a one in each
+    column corresponding to a vertex in the clique. ``cliques`` is either a
+    list of vertex arrays, or a 2-d array with one clique per row."""
+    if isinstance(cliques, np.ndarray):
+        sizes = np.full(cliques.shape[0], cliques.shape[1])
+        columns = cliques.ravel()
+    elif cliques:
+        sizes = np.array([len(clique) for clique in cliques])
+        columns = np.concatenate(cliques)
+    else:
+        sizes = columns = np.empty(0, dtype=int)
+    rows = np.repeat(np.arange(sizes.size), sizes)
+    return sp.csr_array(
+        (np.ones(columns.size), (rows, columns)), shape=(sizes.size, num_vertices)
+    )
+
+
+def _symmetric_adjacency(adjacency_matrix):
+    """Canonical form of the input adjacency matrix: a boolean CSR matrix
+    with sorted indices, containing both directions of every edge exactly
+    once and no self-loops. The input may be dense, or any scipy.sparse
+    matrix or array, and may contain each edge in one or both directions."""
+    edges = sp.coo_array(adjacency_matrix)
+    keep = (edges.row != edges.col) & (edges.data != 0)
+    row, col = edges.row[keep], edges.col[keep]
+    # Duplicates are merged when converting to CSR
+    adjacency = sp.csr_array(
+        (
+            np.ones(2 * row.size, dtype=bool),
+            (np.concatenate([row, col]), np.concatenate([col, row])),
+        ),
+        shape=edges.shape,
+    )
+    adjacency.sum_duplicates()
+    return adjacency
+
+
+def _clique_cover(adjacency):
+    """Greedily cover the edges of a graph with cliques.
+
+    Each edge not yet covered is grown into a maximal clique by repeatedly
+    adding the common neighbour with the most uncovered edges into the clique
+    (ties broken by degree). ``adjacency`` must be a symmetric CSR matrix with
+    sorted indices and no self-loops. Returns a list of sorted vertex arrays.
+    """
+    num_vertices = adjacency.shape[0]
+    indptr, indices = adjacency.indptr, adjacency.indices
+    degree = np.diff(indptr)
+    tie_break = degree / (degree.max(initial=0) + 1)
+
+    # Edges (i, j) with i < j, identified by the sorted key i * n + j
+    upper = sp.triu(adjacency, k=1, format="csr")
+    upper_row = np.repeat(
+        np.arange(num_vertices, dtype=np.int64), np.diff(upper.indptr)
+    )
+    edge_keys = upper_row * num_vertices + upper.indices
+    covered = np.zeros(upper.nnz, dtype=bool)
+
+    def edge_position(i, j):
+        first = np.minimum(i, j).astype(np.int64)
+        return np.searchsorted(edge_keys, first * num_vertices + np.maximum(i, j))
+
+    # An edge whose endpoints have no common neighbour is a maximal clique
+    # on its own, and lies in no other clique. Find all such edges at once,
+    # so that only edges lying in a triangle are grown one at a time.
+    triangles = upper.multiply(adjacency @ adjacency).tocoo()
+    triangles.eliminate_zeros()
+    in_triangle = np.zeros(upper.nnz, dtype=bool)
+    in_triangle[edge_position(triangles.row, triangles.col)] = True
+
+    starts, cliques = [], []
+    for edge in np.flatnonzero(in_triangle):
+        if covered[edge]:
+            continue
+
+        u, v = upper_row[edge], upper.indices[edge]
+        clique = [u, v]
+        candidates = np.intersect1d(
+            indices[indptr[u] : indptr[u + 1]],
+            indices[indptr[v] : indptr[v + 1]],
+            assume_unique=True,
         )
-        model.optimize()
-        return np.where(x.X >= 0.5)[0]
+        score = tie_break[candidates]
+        score += ~covered[edge_position(candidates, u)]
+        score += ~covered[edge_position(candidates, v)]
+        while candidates.size:
+            best = np.argmax(score)
+            w = candidates[best]
+            clique.append(w)
+            keep = np.isin(
+                candidates, indices[indptr[w] : indptr[w + 1]], assume_unique=True
+            )
+            candidates, score = candidates[keep], score[keep]
+            score += ~covered[edge_position(candidates, w)]
+
+        clique = np.sort(clique)
+        first, second = np.triu_indices(clique.size, k=1)
+        covered[edge_position(clique[first], clique[second])] = True
+        starts.append(edge)
+        cliques.append(clique)
+
+    # Merge in the single edges, ordering all cliques by the edge they were
+    # grown from
+    single = np.flatnonzero(~in_triangle)
+    cliques.extend(np.column_stack([upper_row[single], upper.indices[single]]))
+    order = np.argsort(np.concatenate([starts, single]), kind="stable")
+    return [cliques[k] for k in order]
+
+
+def _greedy_independent_set(adjacency, priority, candidates, max_rounds=10):
+    """Select an independent set among the candidate vertices, greedily in
+    order of decreasing priority.
+
+    Rather than visiting vertices one by one, each round selects all
+    remaining candidates whose priority is higher than that of all of their
+    remaining neighbours, and then discards the neighbours of the selected
+    vertices. This gives the same result as the sequential greedy algorithm.
+    Chains of increasing priority (e.g. on a path) only lose a few vertices
+    per round, so after ``max_rounds`` the remaining vertices are visited
+    one by one. Returns a boolean mask of the selected vertices.
+    """
+    # Distinct ranks, so that exactly one vertex of each edge wins ties
+    rank = np.empty(priority.size, dtype=np.int64)
+    rank[np.argsort(priority, kind="stable")] = np.arange(priority.size)
+
+    selected = np.zeros(priority.size, dtype=bool)
+    remaining = np.flatnonzero(candidates)
+    for _ in range(max_rounds):
+        if not remaining.size:
+            return selected
+        subgraph = adjacency[remaining][:, remaining]
+        neighbour_rank = rank[remaining][subgraph.indices]
+        max_neighbour_rank = np.full(remaining.size, -1)
+        has_neighbours = np.diff(subgraph.indptr) > 0
+        if neighbour_rank.size:
+            max_neighbour_rank[has_neighbours] = np.maximum.reduceat(
+                neighbour_rank, subgraph.indptr[:-1][has_neighbours]
+            )
+        local_maximum = rank[remaining] > max_neighbour_rank
+        selected[remaining[local_maximum]] = True
+
+        # Drop the selected vertices and their neighbours
+        dropped = (subgraph[local_maximum].sum(axis=0) > 0) | local_maximum
+        remaining = remaining[~dropped]
+
+    # Sequential pass over the rest, in order of decreasing rank
+    blocked = np.ones(priority.size, dtype=bool)
+    blocked[remaining] = False
+    indptr, indices = adjacency.indptr, adjacency.indices
+    for vertex in remaining[np.argsort(-rank[remaining])].tolist():
+        if not blocked[vertex]:
+            selected[vertex] = True
+            blocked[indices[indptr[vertex] : indptr[vertex + 1]]] = True
+
+    return selected
+
+
+def _heuristic_independent_set(adjacency, weights, max_rounds=100):
+    """Find a good independent set quickly. A greedy solution by weight over
+    degree is improved by 1-swaps: a vertex outside the set whose only
+    neighbour in the set has a lower weight replaces that neighbour. Returns a
+    boolean mask of the selected vertices."""
+    index = np.arange(weights.size)
+    priority = weights / (np.diff(adjacency.indptr) + 1)
+    selected = _greedy_independent_set(adjacency, priority, weights > 0)
+
+    for _ in range(max_rounds):
+        in_set = selected.astype(np.int64)
+        # For vertices with one neighbour in the set, find that neighbour
+        num_neighbours = adjacency @ in_set
+        neighbour = adjacency @ (in_set * index)
+        candidates = np.flatnonzero(~selected & (num_neighbours == 1))
+        partners = neighbour[candidates]
+        gain = weights[candidates] - weights[partners]
+        improving = gain > 0
+        if not improving.any():
+            break
+
+        # Swap in the best candidate for each partner, such that the swapped
+        # in vertices are not adjacent to each other
+        candidates, partners, gain = (
+            candidates[improving],
+            partners[improving],
+            gain[improving],
+        )
+        order = np.argsort(-gain, kind="stable")
+        _, best = np.unique(partners[order], return_index=True)
+        swap_gain = np.zeros(weights.size)
+        swap_gain[candidates[order[best]]] = gain[order[best]]
+        swap_in = _greedy_independent_set(adjacency, swap_gain, swap_gain > 0)
+        selected[neighbour[swap_in]] = False
+        selected[swap_in] = True
+
+        # Removed vertices may have freed up some of their neighbours
+        free = ~selected & (adjacency @ selected.astype(np.int64) == 0) & (weights > 0)
+        selected |= _greedy_independent_set(adjacency, priority, free)
+
+    return selected
@@ -4,13 +4,17 @@ Quadratic Unconstrained Binary Optimization (QUBO)
 """
 
 import logging
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, field
+from typing import List
 
 import gurobipy as gp
 from gurobipy import GRB
 import numpy as np
+import scipy.sparse as sp
 
-from gurobi_optimods.utils import optimod
+from gurobi_optimods.batch import solve_many
+from gurobi_optimods.utils import call_options, optimod
 
 logger = logging.getLogger(__name__)
 
@@ -19,12 +23,55 @@ logger = logging.getLogger(__name__)
 class QuboResult:
     solution: np.ndarray
     objective_value: float
+    solution_pool: List["QuboResult"] = field(default_factory=list, repr=False)
+
+
+@dataclass
+class QuboProgress:
+    """Progress of a QUBO solve, reported to the ``progress`` argument of
+    :func:`solve_qubo`. The bounds are infinite and the gap is infinite
+    until the first solution is found."""
+
+    runtime: float
+    primal_bound: float
+    dual_bound: float
+    gap: float
+    solution_count: int
+
+
+def _relative_gap(primal_bound, dual_bound):
+    if primal_bound == dual_bound:
+        return 0.0
+    if primal_bound >= GRB.INFINITY or primal_bound == 0:
+        return float("inf")
+    return abs(primal_bound - dual_bound) / abs(primal_bound)
+
+
+def _report_progress(receiver, progress):
+    if hasattr(receiver, "put_nowait"):
+        receiver.put_nowait(progress)
+    else:
+        receiver(progress)
 
 
 def callback(model, where):
 
     if where == GRB.Callback.MIP:
         runtime = model.cbGet(GRB.Callback.RUNTIME)
+        if model._progress is not None and runtime >= model._next_progress_time:
+            primal_bound = model.cbGet(GRB.Callback.MIP_OBJBST)
+            dual_bound = model.cbGet(GRB.Callback.MIP_OBJBND)
+            _report_progress(
+                model._progress,
+                QuboProgress(
+                    runtime=runtime,
+                    primal_bound=primal_bound,
+                    dual_bound=dual_bound,
+                    gap=_relative_gap(primal_bound, dual_bound),
+                    solution_count=int(model.cbGet(GRB.Callback.MIP_SOLCNT)),
+                ),
+            )
+            model._next_progress_time = runtime + model._progress_interval
         if runtime >= model._next_output_time:
             primal_bound = model.cbGet(GRB.Callback.MIP_OBJBST)
             dual_bound = model.cbGet(GRB.Callback.MIP_OBJBND)
@@ -37,13 +84,55 @@ def callback(model, where):
             )
             model._next_output_time += 5
 
+        _check_termination(model, runtime)
+
     elif where == GRB.Callback.MIPSOL:
         obj = model.cbGet(GRB.Callback.MIPSOL_OBJ)
         logger.info(f"New QUBO solution found with objective {obj}")
+        if obj < model._incumbent:
+            model._incumbent = obj
+            model._last_improvement_time = model.cbGet(GRB.Callback.RUNTIME)
+        if model._target is not None and obj <= model._target:
+            logger.info(f"Target objective {model._target} reached, stopping")
+            model.terminate()
+
+
+def _check_termination(model, runtime):
+    """Stop the solve early on the gap or stall criteria of solve_qubo"""
+    if model._gap is not None:
+        primal_bound = model.cbGet(GRB.Callback.MIP_OBJBST)
+        dual_bound = model.cbGet(GRB.Callback.MIP_OBJBND)
+        if _relative_gap(primal_bound, dual_bound) <= model._gap:
+            logger.info(f"Gap of {100.0 * model._gap:.2f}% reached, stopping")
+            model.terminate()
+    # The stall clock starts with the first solution
+    if (
+        model._stall_time is not None
+        and model._last_improvement_time is not None
+        and runtime - model._last_improvement_time >= model._stall_time
+    ):
+        logger.info(f"No improvement within {model._stall_time:.0f}s, stopping")
+        model.terminate()
 
 
 @optimod()
-def solve_qubo(coeff_matrix, time_limit=GRB.INFINITY, *, create_env) -> QuboResult:
+def solve_qubo(
+    coeff_matrix,
+    time_limit=GRB.INFINITY,
+    *,
+    method="gurobi",
+    mip_start=None,
+    seed=None,
+    starts=1,
+    workers=None,
+    progress=None,
+    progress_interval=1.0,
+    gap=None,
+    target=None,
+    stall_time=None,
+    preprocess=False,
+    create_env,
+) -> QuboResult:
     """
     Solve a quadratic unconstrained binary optimization (QUBO) problem,
     i.e., minimize quadratic function :math:`x'Qx` defined by coefficient matrix :math:`Q`
@@ -53,6 +142,48 @@ def solve_qubo(coeff_matrix, time_limit=GRB.INFINITY, *, create_env) -> QuboResu
     :type coeff_matrix: :class:`numpy.ndarray` or :class:`scipy.sparse`
     :param time_limit: Time limit in seconds
     :type time_limit: :class:`int`
+    :param method: "gurobi" to solve the QUBO as a MIP, or "anneal" or "tabu"
+        to return the best solution found by simulated annealing or tabu
+        search, without optimality guarantee
+    :type method: :class:`str`
+    :param mip_start: Start solution for the MIP when method is "gurobi":
+        either a 0/1 array, or "anneal" or "tabu" to start from the solution
+        found by the corresponding heuristic
+    :type mip_start: :class:`numpy.ndarray` or :class:`str`
+    :param seed: Random seed for the heuristics and for Gurobi
+    :type seed: :class:`int`
+    :param starts: Number of independent runs with different seeds, derived
+        reproducibly from ``seed``. If larger than 1, the runs are solved in a
+        process pool, the best one is returned and the results of all runs
+        are stored in its ``solution_pool``, from best to worst. The
+        ``verbose``, ``logfile`` and ``solver_params`` arguments apply to
+        each run
+    :type starts: :class:`int`
+    :param workers: Number of processes for multiple starts (optional,
+        defaults to the number of CPUs)
+    :type workers: :class:`int`
+    :param progress: Receiver of :class:`QuboProgress` events while Gurobi
+        solves the MIP, and once more when it finishes: either a callable, or
+        a queue, whose ``put_nowait`` method is called (e.g.
+        :class:`queue.Queue`). Events are sent from the solving thread
+    :type progress: :class:`callable`
+    :param progress_interval: Minimum time in seconds between progress
+        events
+    :type progress_interval: :class:`float`
+    :param gap: Stop Gurobi once the relative gap between the best solution
+        and the best bound is at most this value (optional)
+    :type gap: :class:`float`
+    :param target: Stop Gurobi once a solution with at most this objective
+        value is found (optional)
+    :type target: :class:`float`
+    :param stall_time: Stop Gurobi if the best solution has not improved for
+        this many seconds (optional). The time is counted from the first
+        solution found, so it never stops the solve before a solution exists.
+    :type stall_time: :class:`float`
+    :param preprocess: Fix variables whose optimal value is implied by the
+        signs of their coefficients (first-order persistency) before solving
+        the remaining problem
+    :type preprocess: :class:`bool`
     :return: 0/1 solution array, objective value
     :rtype: :class:`QuboResult`
     """
@@ -66,19 +197,414 @@ def solve_qubo(coeff_matrix, time_limit=GRB.INFINITY, *, create_env) -> QuboResu
 
     n = shape[0]
 
+    if method != "gurobi" and method not in _HEURISTICS:
+        raise ValueError(f"Unknown method: {method}")
+    if mip_start is not None and method != "gurobi":
+        raise ValueError("A MIP start can only be used with method 'gurobi'")
+
+    if starts > 1:
+        if progress is not None:
+            raise ValueError("Progress reporting requires a single start")
+        return _multi_start(
+            seed,
+            starts,
+            workers,
+            coeff_matrix=coeff_matrix,
+            time_limit=time_limit,
+            method=method,
+            mip_start=mip_start,
+            gap=gap,
+            target=target,
+            stall_time=stall_time,
+            preprocess=preprocess,
+        )
+
+    quadratic, linear = _objective_terms(coeff_matrix)
+    values, free, constant = np.zeros(n), np.ones(n, dtype=bool), 0.0
+    if preprocess:
+        values, free, quadratic, linear, constant = _fix_persistent(quadratic, linear)
+        logger.info(f"Preprocessing fixed {n - free.sum()} of {n} variables")
+        if mip_start is not None and not isinstance(mip_start, str):
+            mip_start = np.asarray(mip_start)[free]
+        if not free.any():
+            return QuboResult(solution=values, objective_value=constant)
+
+    def expand(solution):
+        # Complete a solution of the free variables with the fixed ones
+        full = values.copy()
+        full[free] = solution
+        return full
+
+    if method in _HEURISTICS or isinstance(mip_start, str):
+        heuristic = method if method in _HEURISTICS else mip_start
+        if heuristic not in _HEURISTICS:
+            raise ValueError(f"Unknown MIP start heuristic: {heuristic}")
+        solution, objective_value = _HEURISTICS[heuristic](
+            _interactions(quadratic),
+            linear,
+            np.random.default_rng(seed),
+            time.monotonic() + time_limit,
+        )
+        objective_value += constant
+        logger.info(f"QUBO {heuristic} heuristic found objective {objective_value}")
+        if method in _HEURISTICS:
+            return QuboResult(
+                solution=expand(solution), objective_value=objective_value
+            )
+        mip_start = solution
+
     params = {"TimeLimit": time_limit, "LogToConsole": 0}
+    if seed is not None:
+        params["Seed"] = seed % GRB.MAXINT
 
     with create_env(params=params) as env, gp.Model(env=env) as model:
 
-        x = model.addMVar(n, vtype=GRB.BINARY)
-        model.setObjective(x @ coeff_matrix @ x, GRB.MINIMIZE)
+        x = model.addMVar(linear.size, vtype=GRB.BINARY)
+        model.setMObjective(quadratic, linear, constant, x, x, x, GRB.MINIMIZE)
+        if mip_start is not None:
+            x.Start = mip_start
 
-        model._next_output_time = 5
+        _reset_callback(model, progress, progress_interval, gap, target, stall_time)
         model.optimize(callback)
 
+        if progress is not None:
+            primal_bound = model.ObjVal if model.SolCount else GRB.INFINITY
+            _report_progress(
+                progress,
+                QuboProgress(
+                    runtime=model.Runtime,
+                    primal_bound=primal_bound,
+                    dual_bound=model.ObjBound,
+                    gap=_relative_gap(primal_bound, model.ObjBound),
+                    solution_count=model.SolCount,
+                ),
+            )
+
         if model.SolCount == 0:
             raise ValueError(
                 "No solution found, potentially because of a very low time limit."
             )
 
-        return QuboResult(solution=x.X.round(), objective_value=model.ObjVal)
+        return QuboResult(solution=expand(x.X.round()), objective_value=model.ObjVal)
+
+
+@optimod()
+def solve_qubo_batch(
+    coeff_matrices, time_limit=GRB.INFINITY, *, warm_start=True, create_env
+):
+    """
+    Solve a sequence of QUBO problems of the same size, typically sharing
+    the sparsity structure of their coefficient matrices. The environment,
+    binary variables and model are built once; for each instance only the
+    objective is replaced before re-optimizing.
+
+    :param coeff_matrices: Quadratic coefficient matrices
+    :type coeff_matrices: :class:`list` of :class:`numpy.ndarray` or
+        :class:`scipy.sparse`
+    :param time_limit: Time limit in seconds, per instance
+    :type time_limit: :class:`int`
+    :param warm_start: Start each solve from the solution of the previous
+        instance
+    :type warm_start: :class:`bool`
+    :return: 0/1 solution array and objective value of each instance
+    :rtype: :class:`list` of :class:`QuboResult`
+    """
+    results = []
+    params = {"TimeLimit": time_limit, "LogToConsole": 0}
+
+    with create_env(params=params) as env, gp.Model(env=env) as model:
+        x = None
+        for coeff_matrix in coeff_matrices:
+            if coeff_matrix.ndim != 2:
+                raise ValueError("Matrix is not 2-dimensional.")
+            shape = coeff_matrix.shape
+            if shape[0] != shape[1]:
+                raise ValueError("Matrix is not quadratic.")
+            if x is None:
+                x = model.addMVar(shape[0], vtype=GRB.BINARY)
+            elif shape[0] != x.shape[0]:
+                raise ValueError("Matrices of a batch must have the same size.")
+
+            quadratic, linear = _objective_terms(coeff_matrix)
+            model.setMObjective(quadratic, linear, 0.0, x, x, x, GRB.MINIMIZE)
+            if warm_start and results:
+                x.Start = results[-1].solution
+
+            _reset_callback(model)
+            model.optimize(callback)
+
+            if model.SolCount == 0:
+                raise ValueError(
+                    "No solution found, potentially because of a very low time limit."
+                )
+            results.append(
+                QuboResult(solution=x.X.round(), objective_value=model.ObjVal)
+            )
+
+    logger.info(f"Solved {len(results)} QUBO instances")
+    return results
+
+
+def _reset_callback(
+    model,
+    progress=None,
+    progress_interval=1.0,
+    gap=None,
+    target=None,
+    stall_time=None,
+):
+    """Set up the callback data of model for a new solve"""
+    model._next_output_time = 5
+    model._progress = progress
+    model._progress_interval = progress_interval
+    model._next_progress_time = 0.0
+    model._gap = gap
+    model._target = target
+    model._stall_time = stall_time
+    model._incumbent = GRB.INFINITY
+    model._last_improvement_time = None
+
+
+def _multi_start(seed, starts, workers, **kwargs):
+    """Run independent starts of solve_qubo with seeds spawned from ``seed``
+    in a process pool, and return the best result with all results as its
+    pool. The output and solver settings of the current call apply to each
+    start."""
+    seeds = [
+        int(child.generate_state(1)[0])
+        for child in np.random.SeedSequence(seed).spawn(starts)
+    ]
+    batch = solve_many(
+        solve_qubo,
+        [{"seed": start_seed} for start_seed in seeds],
+        workers=workers,
+        executor="process",
+        **call_options(),
+        **kwargs,
+    )
+
+    results = [start.result for start in batch if start.success]
+    if not results:
+        raise batch[0].error
+    results.sort(key=lambda result: result.objective_value)
+    logger.info(
+        f"Best objective of {len(results)} successful starts: "
+        f"{results[0].objective_value}"
+    )
+    return QuboResult(
+        solution=results[0].solution,
+        objective_value=results[0].objective_value,
+        solution_pool=results,
+    )
+
+
+def _objective_terms(coeff_matrix):
+    """Split x'Qx over binary x into a quadratic part without diagonal and a
+    linear part holding the diagonal (since x_i * x_i = x_i). Dense matrices
+    are folded into their upper triangle; for sparse matrices, the COO
+    triplets are passed on as is and Gurobi merges duplicate and symmetric
+    entries while loading them."""
+    n = coeff_matrix.shape[0]
+    if not sp.issparse(coeff_matrix):
+        coeff_matrix = np.asarray(coeff_matrix, dtype=float)
+        quadratic = np.triu(coeff_matrix, 1)
+        quadratic += np.triu(coeff_matrix.T, 1)
+        return quadratic, np.diag(coeff_matrix).copy()
+
+    coo = sp.coo_array(coeff_matrix)
+    diagonal = coo.row == coo.col
+    linear = np.bincount(coo.row[diagonal], weights=coo.data[diagonal], minlength=n)
+    offdiagonal = ~diagonal
+    quadratic = sp.coo_array(
+        (
+            coo.data[offdiagonal].astype(float),
+            (coo.row[offdiagonal], coo.col[offdiagonal]),
+        ),
+        shape=(n, n),
+    )
+    return quadratic, linear
+
+
+def _fix_persistent(quadratic, linear):
+    """First-order persistency: given the other variables, setting x_i = 1
+    changes the objective by l_i + sum_j S_ij x_j. If this is nonnegative
+    even when all negative interactions apply, x_i = 0 in some optimal
+    solution; if it is nonpositive even when all positive interactions
+    apply, x_i = 1. Fixing variables tightens the bounds of the others, so
+    this is repeated until nothing changes.
+
+    Returns the fixed values (0 for free variables), a mask of the free
+    variables, the quadratic and linear terms of the reduced problem over the
+    free variables, and the objective constant contributed by fixed
+    variables."""
+    interactions = _interactions(quadratic)
+    if sp.issparse(interactions):
+        negative = interactions.minimum(0)
+        positive = interactions.maximum(0)
+    else:
+        negative = np.minimum(interactions, 0)
+        positive = np.maximum(interactions, 0)
+
+    values = np.zeros(linear.size)
+    free = np.ones(linear.size, dtype=bool)
+    while True:
+        effective = linear + interactions @ values
+        weights = free.astype(float)
+        zero = free & (effective + negative @ weights >= 0)
+        one = free & (effective + positive @ weights <= 0) & ~zero
+        if not (zero.any() or one.any()):
+            break
+        values[one] = 1.0
+        free &= ~(zero | one)
+
+    effective = linear + interactions @ values
+    constant = float((linear + effective) @ values / 2)
+    if sp.issparse(interactions):
+        reduced = sp.triu(interactions[free][:, free], 1, format="csr")
+    else:
+        reduced = np.triu(interactions[np.ix_(free, free)], 1)
+    return values, free, reduced, effective[free], constant
+
+
+def _interactions(quadratic):
+    """Symmetric interaction matrix S of the quadratic objective part, such
+    that x'Qx = l'x + x'Sx / 2"""
+    if sp.issparse(quadratic):
+        return sp.csr_array(quadratic + quadratic.T)
+    return quadratic + quadratic.T
+
+
+def _energy(interactions, linear, x):
+    return float(linear @ x + x @ (interactions @ x) / 2)
+
+
+def _flip_gains(linear, x, field):
+    """Change of the objective when flipping each variable, given the field
+    S @ x"""
+    return (1 - 2 * x) * (linear + field)
+
+
+def _color_classes(interactions, rng):
+    """Partition the variables into classes of pairwise non-interacting
+    variables, which can be flipped simultaneously. Each round selects the
+    remaining variables whose random rank beats that of all of their remaining
+    neighbours."""
+    n = interactions.shape[0]
+    if not sp.issparse(interactions):
+        return [np.array([i]) for i in rng.permutation(n)]
+
+    pattern = interactions.astype(bool)
+    rank = rng.permutation(n)
+    classes = []
+    remaining = np.arange(n)
+    while remaining.size:
+        subgraph = pattern[remaining][:, remaining]
+        neighbour_rank = rank[remaining][subgraph.indices]
+        max_neighbour_rank = np.full(remaining.size, -1)
+        has_neighbours = np.diff(subgraph.indptr) > 0
+        if neighbour_rank.size:
+            max_neighbour_rank[has_neighbours] = np.maximum.reduceat(
+                neighbour_rank, subgraph.indptr[:-1][has_neighbours]
+            )
+        local_maximum = rank[remaining] > max_neighbour_rank
+        classes.append(remaining[local_maximum])
+        remaining = remaining[~local_maximum]
+    return classes
+
+
+def _anneal(interactions, linear, rng, deadline, sweeps=200):
+    """Simulated annealing with a geometric inverse temperature schedule.
+
+    The hot temperature accepts the largest possible objective increase of a
+    single flip with probability 1/2, the cold one the smallest nonzero
+    coefficient with probability 1/100. Each sweep visits the variables one
+    class of non-interacting variables at a time, so that the Metropolis step
+    of a whole class is a single vectorized operation."""
+    n = linear.size
+    x = rng.integers(0, 2, size=n).astype(float)
+    field = interactions @ x
+    energy = _energy(interactions, linear, x)
+    best_x, best_energy = x.copy(), energy
+
+    magnitudes = np.abs(interactions).sum(axis=1) + np.abs(linear)
+    if sp.issparse(interactions):
+        coefficients = np.abs(np.concatenate([interactions.data, linear]))
+    else:
+        coefficients = np.abs(np.concatenate([interactions.ravel(), linear]))
+    coefficients = coefficients[coefficients > 0]
+    if coefficients.size == 0:
+        return best_x, best_energy
+    betas = np.geomspace(
+        np.log(2) / magnitudes.max(), np.log(100) / coefficients.min(), sweeps
+    )
+
+    classes = _color_classes(interactions, rng)
+    for beta in betas:
+        for variables in classes:
+            gains = _flip_gains(linear[variables], x[variables], field[variables])
+            accept = (gains <= 0) | (
+                rng.random(variables.size) < np.exp(-beta * gains.clip(0))
+            )
+            if not accept.any():
+                continue
+            flipped = variables[accept]
+            step = 1 - 2 * x[flipped]
+            x[flipped] += step
+            field += step @ interactions[flipped]
+            energy += gains[accept].sum()
+        if energy < best_energy:
+            best_x, best_energy = x.copy(), energy
+        if time.monotonic() > deadline:
+            break
+
+    return best_x, _energy(interactions, linear, best_x)
+
+
+def _tabu(interactions, linear, rng, deadline, iterations=None, tenure=None):
+    """One-flip tabu search: each iteration flips the variable with the best
+    objective change that was not flipped in the last ``tenure`` iterations,
+    unless flipping it gives a new best solution."""
+    n = linear.size
+    iterations = 10 * n if iterations is None else iterations
+    tenure = min(20, n // 4 + 1) if tenure is None else tenure
+
+    x = rng.integers(0, 2, size=n).astype(float)
+    field = interactions @ x
+    energy = _energy(interactions, linear, x)
+    best_x, best_energy = x.copy(), energy
+    tabu_until = np.zeros(n, dtype=np.int64)
+
+    for iteration in range(iterations):
+        gains = _flip_gains(linear, x, field)
+        allowed = (tabu_until <= iteration) | (energy + gains < best_energy)
+        gains[~allowed] = np.inf
+        best_gain = gains.min()
+        if best_gain == np.inf:
+            continue
+        # Break ties randomly to avoid cycling
+        ties = np.flatnonzero(gains == best_gain)
+        i = ties[rng.integers(ties.size)]
+
+        step = 1 - 2 * x[i]
+        x[i] += step
+        _add_row(field, interactions, i, step)
+        energy += best_gain
+        tabu_until[i] = iteration + tenure + 1
+        if energy < best_energy:
+            best_x, best_energy = x.copy(), energy
+        if iteration % 100 == 0 and time.monotonic() > deadline:
+            break
+
+    return best_x, _energy(interactions, linear, best_x)
+
+
+def _add_row(vector, matrix, i, scale):
+    """Add scale times row i of a dense or CSR matrix to vector in place"""
+    if sp.issparse(matrix):
+        start, end = matrix.indptr[i], matrix.indptr[i + 1]
+        vector[matrix.indices[start:end]] += scale * matrix.data[start:end]
+    else:
+        vector += scale * matrix[i]
+
+
+_HEURISTICS = {"anneal": _anneal, "tabu": _tabu}
@@ -3,10 +3,14 @@ Regression
 ----------
 """
 
+from contextlib import ExitStack, contextmanager
+
 import gurobipy as gp
+import numpy as np
+import scipy.sparse as sp
 from gurobipy import GRB
 
-from gurobi_optimods.utils import optimod
+from gurobi_optimods.utils import call_options, names_enabled, optimod
 
 
 class RegressionBase:
@@ -17,53 +21,462 @@ class RegressionBase:
         self.coef_ = None
         self.intercept_ = None
 
-    def predict(self, X_test):
+    def predict(self, X_test, out=None):
         """Predict target value from test data
 
-        :param X_test: Feature data for a new unseen dataset
+        :param X_test: Feature data for a new unseen dataset, either dense
+            (including :class:`np.memmap`) or a scipy.sparse matrix
         :type X_test: :class:`np.array`
-        :return: Outputs predicted by the model for the feature data
+        :param out: Optional float array of shape ``(n,)`` (or ``(n, k)`` if
+            ``k`` models were fitted at once) to write the predictions into,
+            avoiding the allocation of a new array for dense data
+        :type out: :class:`np.array`
+        :return: Outputs predicted by the model for the feature data, with
+            one column per fitted model if several were fitted at once
         :rtype: :class:`np.array`
         """
-        return (X_test * self.coef_).sum(axis=1) + self.intercept_
+        coef = self.coef_.T
+        if out is None:
+            return X_test @ coef + self.intercept_
+        if sp.issparse(X_test):
+            # Sparse products always allocate their result
+            out[...] = X_test @ coef
+        else:
+            np.matmul(X_test, coef, out=out)
+        out += self.intercept_
+        return out
+
+    def predict_batches(self, batches, out=None):
+        """Predict target values for each batch of test data produced by an
+        iterable, e.g. a generator reading chunks of records from disk.
+
+        :param batches: Iterable of feature data batches, each accepted by
+            :meth:`predict`
+        :type batches: :class:`Iterable`
+        :param out: Optional buffer with at least as many rows as the largest
+            batch. If given, each batch is predicted into the leading rows of
+            the buffer, so the yielded arrays are only valid until the next
+            batch is requested.
+        :type out: :class:`np.array`
+        :return: Generator of predicted outputs, one array per batch
+        :rtype: :class:`Generator`
+        """
+        for X_batch in batches:
+            if out is None:
+                yield self.predict(X_batch)
+            else:
+                yield self.predict(X_batch, out=out[: X_batch.shape[0]])
+
+
+class QuantileRegression(RegressionBase):
+    """Quantile regressor, minimizing the sum of positive errors weighted by
+    ``tau`` and negative errors weighted by ``1 - tau``
+
+    :param tau: Quantile to fit, strictly between 0 and 1. If a sequence of
+        quantiles is given, :meth:`fit` solves for all of them using a single
+        model, changing only the objective between solves, and ``coef_`` and
+        ``intercept_`` have one row (entry) per quantile.
+    :type tau: :class:`float`
+    :param chunk_size: Number of training records added to the model at a
+        time. Limits the memory used while building the model for large
+        datasets.
+    :type chunk_size: :class:`int`
+    :param warm_start: Keep the Gurobi model alive after :meth:`fit`, so that
+        the training data can be updated with :meth:`refit` and re-solved
+        starting from the previous solution. Call :meth:`close` (or use the
+        regressor as a context manager) to release the model.
+    :type warm_start: :class:`bool`
+    :param formulation: Linear program solved by :meth:`fit`. The "primal"
+        formulation has two error variables per record. The "dual"
+        formulation has one bounded variable per record but only one
+        constraint per feature, which is usually much faster for tall
+        datasets with few features. It does not support ``warm_start``.
+    :type formulation: :class:`str`
+    """
+
+    def __init__(
+        self, tau=0.5, chunk_size=100_000, warm_start=False, formulation="primal"
+    ):
+        super().__init__()
+        taus = np.asarray(tau, dtype=float)
+        if taus.ndim > 1 or taus.size == 0 or ((taus <= 0) | (taus >= 1)).any():
+            raise ValueError("Quantiles must lie strictly between 0 and 1")
+        if formulation not in ("primal", "dual"):
+            raise ValueError(f"Unknown formulation: {formulation}")
+        if warm_start and formulation != "primal":
+            raise ValueError("warm_start requires the primal formulation")
+        self.tau = tau
+        self.chunk_size = chunk_size
+        self.warm_start = warm_start
+        self.formulation = formulation
+        self._model_stack = None
+
+    def __enter__(self):
+        return self
 
+    def __exit__(self, *exc_info):
+        self.close()
 
-class LADRegression(RegressionBase):
-    """Least absolute deviations (L1-norm) regressor"""
+    def close(self):
+        """Release the Gurobi model and environment kept alive by
+        ``warm_start=True``."""
+        if self._model_stack is not None:
+            self._model_stack.close()
+            self._model_stack = None
 
     @optimod()
     def fit(self, X_train, y_train, *, create_env):
         """Fit the model to training data.
 
-        :param X_train: Training set feature values
+        :param X_train: Training set feature values. Can also be a
+            scipy.sparse matrix, in which case the model is built from the
+            nonzero entries only, or a memory-mapped array
+            (:class:`np.memmap`), which is read in chunks of records.
         :type X_train: :class:`np.array`
         :param y_train: Training set output values
         :type y_train: :class:`np.array`
         """
 
         # Metadata about the input data
-        records, n_features_in = X_train.shape
+        n_features_in = X_train.shape[1]
+
+        # Discard the model kept from a previous fit
+        self.close()
+
+        if self.formulation == "dual":
+            with create_env() as env, gp.Model(env=env) as model:
+                self._fit_dual(model, X_train, y_train)
+            return
 
         # Create model
-        with create_env() as env, gp.Model(env=env) as model:
+        with ExitStack() as stack:
+            env = stack.enter_context(create_env())
+            model = stack.enter_context(gp.Model(env=env))
 
             # Create unbounded variables for each column coefficient, and bound
             # magnitudes using additional variables. Keep intercept separate.
-            intercept = model.addVar(lb=-GRB.INFINITY, name="intercept")
-            coeff = model.addMVar(n_features_in, lb=-GRB.INFINITY, name="coeff")
-            pos_error = model.addMVar(records, name="pos_error")
-            neg_error = model.addMVar(records, name="neg_error")
+            # Minimize the weighted sum of the errors.
+            intercept, coeff = _add_coefficients(model, n_features_in)
+            model.ModelSense = GRB.MINIMIZE
+            records = self._add_records(model, intercept, coeff, X_train, y_train)
 
-            # Create linear relationship with deviation variables
-            relation = (X_train * coeff).sum(axis=1) + intercept + pos_error - neg_error
-            model.addConstr(relation == y_train, name="fit")
+            # Solve and store results
+            self._solve_quantiles(model, intercept, coeff, records)
 
-            # Minimize least absolute deviations
-            abs_error = pos_error + neg_error
-            mean_abs_error = abs_error.sum()
-            model.setObjective(mean_abs_error, sense=GRB.MINIMIZE)
+            if self.warm_start:
+                # Keep the model open for later calls to refit
+                self._model = model
+                self._intercept = intercept
+                self._coeff = coeff
+                self._records = records
+                self._records_added = X_train.shape[0]
+                self._model_stack = stack.pop_all()
 
-            # Solve and store results
+    @optimod()
+    def refit(self, X_add=None, y_add=None, remove=None, y_train=None, *, create_env):
+        """Update the training data of a regressor fitted with
+        ``warm_start=True``, and re-solve the model starting from the previous
+        solution. Training records are first removed, then the output values
+        of the remaining records are updated, and finally new records are
+        appended. The ``verbose``, ``logfile`` and ``solver_params`` options
+        of this call apply to the re-solve only.
+
+        :param X_add: Feature values of records to append (optional)
+        :type X_add: :class:`np.array`
+        :param y_add: Output values of records to append (optional)
+        :type y_add: :class:`np.array`
+        :param remove: Indices (or boolean mask) of training records to remove
+            (optional)
+        :type remove: :class:`np.array`
+        :param y_train: New output values of the training records, after
+            removing records (optional)
+        :type y_train: :class:`np.array`
+        """
+        if self._model_stack is None:
+            raise ValueError("refit requires a model fitted with warm_start=True")
+
+        model = self._model
+        constrs, pos_error, neg_error = self._records
+
+        if remove is not None:
+            model.remove(
+                constrs[remove].tolist()
+                + pos_error[remove].tolist()
+                + neg_error[remove].tolist()
+            )
+            constrs, pos_error, neg_error = (
+                np.delete(constrs, remove),
+                np.delete(pos_error, remove),
+                np.delete(neg_error, remove),
+            )
+
+        if y_train is not None:
+            model.setAttr("RHS", constrs.tolist(), np.asarray(y_train).tolist())
+
+        if X_add is not None:
+            added = self._add_records(
+                model,
+                self._intercept,
+                self._coeff,
+                X_add,
+                y_add,
+                first=self._records_added,
+            )
+            self._records_added += X_add.shape[0]
+            constrs, pos_error, neg_error = (
+                np.concatenate([constrs, added[0]]),
+                np.concatenate([pos_error, added[1]]),
+                np.concatenate([neg_error, added[2]]),
+            )
+
+        self._records = constrs, pos_error, neg_error
+
+        # The kept model belongs to the environment of the fit call, so the
+        # options of this call are applied to the model while re-solving.
+        # Gurobi continues from the basis of the previous solve.
+        options = call_options()
+        params = {"OutputFlag": int(options["verbose"])}
+        params.update(options["solver_params"] or {})
+        with _model_params(model, params):
+            self._solve_quantiles(model, self._intercept, self._coeff, self._records)
+
+    @optimod()
+    def fit_path(self, X_train, y_train, lambdas, *, create_env):
+        """Fit L1-regularized models to training data for a sequence of
+        regularization weights, minimizing the (weighted) sum of absolute
+        errors plus ``lambda`` times the sum of absolute coefficient values.
+        The intercept is not regularized. Requires a single quantile.
+
+        A single model is built; only the objective coefficients change
+        between solves, so that each solve starts from the optimal basis of
+        the previous one. Solving for decreasing values of ``lambda`` is
+        usually fastest. The fitted coefficients of the regressor are not
+        modified.
+
+        :param X_train: Training set feature values
+        :type X_train: :class:`np.array`
+        :param y_train: Training set output values
+        :type y_train: :class:`np.array`
+        :param lambdas: Non-negative regularization weights
+        :type lambdas: :class:`np.array`
+        :return: Coefficients with shape ``(len(lambdas), n_features)`` and
+            intercepts with shape ``(len(lambdas),)``, in the order of
+            ``lambdas``
+        :rtype: :class:`tuple` of :class:`np.array`
+        """
+        if len(self._error_weights()) > 1:
+            raise ValueError("fit_path requires a single quantile")
+        lambdas = np.asarray(lambdas, dtype=float)
+        if (lambdas < 0).any():
+            raise ValueError("Regularization weights must be non-negative")
+
+        n_features_in = X_train.shape[1]
+        coefs = np.empty((lambdas.shape[0], n_features_in))
+        intercepts = np.empty(lambdas.shape[0])
+
+        with create_env() as env, gp.Model(env=env) as model:
+            intercept, coeff = _add_coefficients(model, n_features_in)
+            model.ModelSense = GRB.MINIMIZE
+            self._add_records(model, intercept, coeff, X_train, y_train, track=False)
+
+            # Bound coefficient magnitudes; the regularization weight is the
+            # objective coefficient of the bounds
+            names = names_enabled()
+            abs_coeff = model.addMVar(
+                n_features_in, name="abs_coeff" if names else None
+            )
+            model.addConstr(coeff <= abs_coeff, name="abs_coeff_pos" if names else None)
+            model.addConstr(
+                -coeff <= abs_coeff, name="abs_coeff_neg" if names else None
+            )
+
+            for i, lam in enumerate(lambdas):
+                abs_coeff.Obj = lam
+                model.optimize()
+                coefs[i] = coeff.X
+                intercepts[i] = intercept.X
+
+        return coefs, intercepts
+
+    def _fit_dual(self, model, X_train, y_train):
+        """Solve the LP dual of the weighted errors problem,
+
+            max  y^T u
+            s.t. X^T u = 0
+                 1^T u = 0
+                 -w_neg <= u <= w_pos
+
+        and store the coefficients and intercept, which are the duals of the
+        constraints."""
+        records = X_train.shape[0]
+        if sp.issparse(X_train):
+            X_train = X_train.tocsr()
+        y_train = np.asarray(y_train)
+
+        # Bounds are set per quantile below
+        names = names_enabled()
+        u = model.addMVar(
+            records, lb=-GRB.INFINITY, obj=y_train, name="u" if names else None
+        )
+        model.ModelSense = GRB.MAXIMIZE
+
+        # Accumulate X^T u one chunk of records at a time, in place so that
+        # the expression is not copied for every chunk
+        expr = 0
+        for start in range(0, records, self.chunk_size):
+            rows = slice(start, start + self.chunk_size)
+            expr += X_train[rows].T @ u[rows]
+        coeff = model.addConstr(expr == 0, name="coeff" if names else None)
+        intercept = model.addConstr(u.sum() == 0, name="intercept" if names else None)
+
+        results = []
+        for pos_weight, neg_weight in self._error_weights():
+            # Changing the bounds keeps the previous basis
+            u.LB = -neg_weight
+            u.UB = pos_weight
+            model.optimize()
+            results.append((intercept.Pi.item(), coeff.Pi))
+        self._store_quantiles(results)
+
+    def _solve_quantiles(self, model, intercept, coeff, records):
+        """Solve the primal model for each quantile, changing only the
+        objective weights of the errors between solves, and store the
+        results."""
+        _, pos_error, neg_error = records
+        weights = self._error_weights()
+        results = []
+        for pos_weight, neg_weight in weights:
+            if len(weights) > 1:
+                n = pos_error.shape[0]
+                model.setAttr("Obj", pos_error.tolist(), [pos_weight] * n)
+                model.setAttr("Obj", neg_error.tolist(), [neg_weight] * n)
             model.optimize()
-            self.intercept_ = intercept.X
-            self.coef_ = coeff.X
+            results.append((intercept.X, coeff.X))
+        self._store_quantiles(results)
+
+    def _store_quantiles(self, results):
+        intercepts, coefs = zip(*results)
+        if np.ndim(self.tau) == 0:
+            self.intercept_, self.coef_ = intercepts[0], coefs[0]
+        else:
+            self.intercept_, self.coef_ = np.array(intercepts), np.vstack(coefs)
+
+    def _error_weights(self):
+        """Objective weights of the positive and negative errors, one row per
+        quantile"""
+        taus = np.atleast_1d(np.asarray(self.tau, dtype=float))
+        return np.column_stack([taus, 1.0 - taus])
+
+    def _add_records(self, model, intercept, coeff, X, y, track=None, first=0):
+        """Add error variables and fit constraints for the given records, in
+        chunks, naming them from index ``first``. Returns the constraints and
+        error variables; if the model is kept for later updates (``track``,
+        defaulting to ``warm_start``), as object arrays with one entry per
+        record."""
+        records = X.shape[0]
+        if sp.issparse(X):
+            # Row slicing needs a compressed row format
+            X = X.tocsr()
+        y = np.asarray(y)
+
+        names = names_enabled()
+        pos_weight, neg_weight = self._error_weights()[0]
+        last = first + records
+        pos_error = model.addMVar(
+            records,
+            obj=pos_weight,
+            name=_record_names("pos_error", first, last) if names else None,
+        )
+        neg_error = model.addMVar(
+            records,
+            obj=neg_weight,
+            name=_record_names("neg_error", first, last) if names else None,
+        )
+
+        # Create linear relationship with deviation variables, one chunk of
+        # records at a time to bound the size of the expressions
+        constrs = []
+        for start in range(0, records, self.chunk_size):
+            rows = slice(start, start + self.chunk_size)
+            relation = X[rows] @ coeff + intercept + pos_error[rows] - neg_error[rows]
+            fit_names = (
+                _record_names("fit", first + start, first + min(rows.stop, records))
+                if names
+                else None
+            )
+            constrs.append(model.addConstr(relation == y[rows], name=fit_names))
+
+        if not (self.warm_start if track is None else track):
+            return constrs, pos_error, neg_error
+
+        def to_array(items):
+            array = np.empty(len(items), dtype=object)
+            array[:] = items
+            return array
+
+        return (
+            to_array([constr for mconstr in constrs for constr in mconstr.tolist()]),
+            to_array(pos_error.tolist()),
+            to_array(neg_error.tolist()),
+        )
+
+
+def _add_coefficients(model, n_features_in):
+    """Add the unbounded intercept and coefficient variables"""
+    names = names_enabled()
+    intercept = model.addVar(lb=-GRB.INFINITY, name="intercept" if names else "")
+    coeff = model.addMVar(
+        n_features_in, lb=-GRB.INFINITY, name="coeff" if names else None
+    )
+    return intercept, coeff
+
+
+def _record_names(prefix, start, stop):
+    """Names of the form ``prefix[i]`` for records ``start`` to ``stop - 1``,
+    so that records added in separate chunks or calls get distinct names"""
+    return np.array([f"{prefix}[{i}]" for i in range(start, stop)])
+
+
+@contextmanager
+def _model_params(model, params):
+    """Set parameters on a model for the duration of the context, restoring
+    their previous values afterwards"""
+    saved = {name: model.getParamInfo(name)[2] for name in params}
+    for name, value in params.items():
+        model.setParam(name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            model.setParam(name, value)
+
+
+class LADRegression(QuantileRegression):
+    """Least absolute deviations (L1-norm) regressor, i.e. the median
+    (``tau=0.5``) quantile regressor with the sum of absolute errors as its
+    objective
+
+    :param chunk_size: Number of training records added to the model at a
+        time. Limits the memory used while building the model for large
+        datasets.
+    :type chunk_size: :class:`int`
+    :param warm_start: Keep the Gurobi model alive after :meth:`fit`, so that
+        the training data can be updated with :meth:`refit` and re-solved
+        starting from the previous solution. Call :meth:`close` (or use the
+        regressor as a context manager) to release the model.
+    :type warm_start: :class:`bool`
+    :param formulation: Linear program solved by :meth:`fit`, either
+        "primal" or "dual" (see :class:`QuantileRegression`)
+    :type formulation: :class:`str`
+    """
+
+    def __init__(self, chunk_size=100_000, warm_start=False, formulation="primal"):
+        super().__init__(
+            tau=0.5,
+            chunk_size=chunk_size,
+            warm_start=warm_start,
+            formulation=formulation,
+        )
+
+    def _error_weights(self):
+        return np.ones((1, 2))
@@ -1,3 +1,8 @@
+"""
+Utilities
+---------
+"""
+
 # One possible idea for handling output suppression/file logging. Mods need
 # to be decorated with @optimod and accept a create_env keyword argument. This
 # factory function should be used to create the mod's gurobi environments.
@@ -11,14 +16,30 @@
 # suppresses all output, and logfile=<file-path>, which creates a log file
 # including logger output from the mod and gurobi output.
 #
-# Note that this won't handle multi-threaded stuff well (context manipulates
-# global logger handlers). But it's simpler to implement in the mods than
-# passing some funky log collecting object around.
+# Log handlers are not attached to the loggers directly. Instead, each logger
+# gets a single _ContextHandler which forwards records to the handlers of the
+# optimod call running in the current context (thread or asyncio task). This
+# keeps log output of mods running concurrently in a thread pool separate,
+# without having to pass some funky log collecting object around.
+#
+# Callers which run many mods can also pass env_pool=<EnvPool>, in which case
+# create_env hands out environments from the pool instead of starting a new
+# one for every call. Mods don't need to do anything special for this to work.
+#
+# Passing fast_build=True skips naming variables and constraints. Names only
+# matter for debugging (e.g. reading a model written to an LP file), but take
+# noticeable time and memory for large models. Mods check names_enabled()
+# before generating names:
+#
+#   names = names_enabled()
+#   x = model.addMVar(n, name="x" if names else None)
 
+import contextvars
 import functools
 import logging
 import re
 import sys
+import threading
 from contextlib import contextmanager
 from typing import Dict, Optional
 
@@ -29,6 +50,23 @@ grb_logger = logging.getLogger(r"gurobipy")
 re_module_base_name = re.compile(r"gurobipy\.|gurobi_optimods\.")
 
 
+_fast_build = contextvars.ContextVar("fast_build", default=False)
+_call_options = contextvars.ContextVar("call_options", default={})
+
+
+def names_enabled() -> bool:
+    """Whether the running optimod should name the variables and constraints
+    it creates, i.e. it was not called with ``fast_build=True``"""
+    return not _fast_build.get()
+
+
+def call_options() -> Dict:
+    """The ``verbose``, ``logfile``, ``solver_params`` and ``fast_build``
+    arguments of the running optimod call, for mods which pass them on to
+    nested optimod calls"""
+    return dict(_call_options.get())
+
+
 class ShortFormatter(logging.Formatter):
     def __init__(self):
         super().__init__("%(name)s: %(message)s")
@@ -39,6 +77,144 @@ class ShortFormatter(logging.Formatter):
         return s
 
 
+class _ContextHandler(logging.Handler):
+    """Forwards log records to the handlers registered for the current
+    context, so that concurrent optimod calls each see only their own
+    records."""
+
+    def __init__(self, name):
+        super().__init__()
+        self._handlers = contextvars.ContextVar(name, default=())
+
+    def handle(self, record):
+        handlers = self._handlers.get()
+        if not handlers:
+            self._handle_unrouted(record)
+        # No locking needed here: the target handlers lock themselves
+        for handler in handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def _handle_unrouted(self, record):
+        """Handle a record as if this handler was not installed: if no other
+        handler sees it, it goes to logging.lastResort (so that warnings
+        still reach stderr)"""
+        last_resort = logging.lastResort
+        if last_resort is None or record.levelno < last_resort.level:
+            return
+        logger = logging.getLogger(record.name)
+        while logger:
+            if any(handler is not self for handler in logger.handlers):
+                return
+            if not logger.propagate:
+                break
+            logger = logger.parent
+        last_resort.handle(record)
+
+    def emit(self, record):
+        self.handle(record)
+
+    @contextmanager
+    def route(self, *handlers):
+        """Send records to the given handlers for the duration of the context"""
+        token = self._handlers.set(self._handlers.get() + handlers)
+        try:
+            yield
+        finally:
+            self._handlers.reset(token)
+
+
+_context_handlers_lock = threading.Lock()
+
+
+def _context_handler(logger: logging.Logger) -> _ContextHandler:
+    """Return the context handler attached to logger, installing it on first
+    use"""
+    with _context_handlers_lock:
+        for handler in logger.handlers:
+            if isinstance(handler, _ContextHandler):
+                return handler
+        handler = _ContextHandler(f"{logger.name}_handlers")
+        logger.addHandler(handler)
+        return handler
+
+
+class EnvPool:
+    """A pool of reusable Gurobi environments, shared across optimod calls.
+
+    Environments are keyed by their parameter settings, so each distinct
+    combination of parameters gets its own set of environments. An environment
+    is checked out of the pool for the duration of a ``with create_env()``
+    block in the mod, and its parameters are reset before it is handed out
+    again. Pass an instance to any optimod using the ``env_pool`` keyword
+    argument::
+
+        pool = EnvPool()
+        for arc_data, demand_data in instances:
+            min_cost_flow(arc_data, demand_data, env_pool=pool)
+        pool.close()
+
+    The pool is thread-safe. Environments should not be shared across
+    processes.
+    """
+
+    def __init__(self):
+        self._idle = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @contextmanager
+    def env(self, params: Dict):
+        """Check out an environment with the given parameters for the
+        duration of the context, creating one if none is available."""
+        key = tuple(sorted(params.items()))
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Environment pool has been closed")
+            idle = self._idle.setdefault(key, [])
+            env = idle.pop() if idle else None
+        if env is None:
+            env = gp.Env(params=params)
+
+        try:
+            yield env
+        finally:
+            self._reset(env, params)
+            with self._lock:
+                if self._closed:
+                    env.dispose()
+                else:
+                    self._idle[key].append(env)
+
+    @staticmethod
+    def _reset(env, params):
+        # Restore the parameters the environment was created with. Output is
+        # silenced while doing so, to avoid echoing each parameter change.
+        env.setParam("OutputFlag", 0)
+        env.resetParams()
+        env.setParam("OutputFlag", 0)
+        for name, value in params.items():
+            if name != "OutputFlag":
+                env.setParam(name, value)
+        env.setParam("OutputFlag", params.get("OutputFlag", 1))
+
+    def close(self):
+        """Dispose of all idle environments. Environments which are checked
+        out when the pool is closed are disposed when they are returned."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, {}
+        for envs in idle.values():
+            for env in envs:
+                env.dispose()
+
+
 @contextmanager
 def _mod_context(
     *,
@@ -46,12 +222,16 @@ def _mod_context(
     log_to_console: bool,
     log_to_file: Optional[str],
     user_params: Optional[Dict],
+    env_pool: Optional[EnvPool] = None,
+    fast_build: bool = False,
 ):
     if not log_to_console and log_to_file:
         raise ValueError("Cannot disable console output and log to file")
 
     # Base setting: silence
     decorator_params = {"OutputFlag": 0}
+    mod_handlers = []
+    grb_handlers = []
 
     if log_to_console:
         # Gurobi console output handled by environment
@@ -62,7 +242,7 @@ def _mod_context(
         ch.setLevel(logging.INFO)
         ch.setFormatter(logging.Formatter("%(message)s"))
         mod_logger.setLevel(logging.INFO)
-        mod_logger.addHandler(ch)
+        mod_handlers.append(ch)
 
     if log_to_file:
         # Handle all file logging using the python logger
@@ -73,9 +253,9 @@ def _mod_context(
         fh.setFormatter(ShortFormatter())
 
         # Send both mod logs and gurobi logs to the same file handler
-        mod_logger.addHandler(fh)
+        mod_handlers.append(fh)
         grb_logger.setLevel(logging.INFO)
-        grb_logger.addHandler(fh)
+        grb_handlers.append(fh)
 
     # Environment factory for decorated mod to use
     def create_env(params=None):
@@ -85,18 +265,29 @@ def _mod_context(
             final_params.update(params)
         if user_params:
             final_params.update(user_params)
+        if env_pool is not None:
+            return env_pool.env(final_params)
         return gp.Env(params=final_params)
 
+    token = _fast_build.set(fast_build)
+    options_token = _call_options.set(
+        {
+            "verbose": log_to_console,
+            "logfile": log_to_file,
+            "solver_params": user_params,
+            "fast_build": fast_build,
+        }
+    )
     try:
-        yield create_env
+        with _context_handler(mod_logger).route(*mod_handlers), _context_handler(
+            grb_logger
+        ).route(*grb_handlers):
+            yield create_env
 
     finally:
-        if log_to_console:
-            mod_logger.removeHandler(ch)
-
+        _call_options.reset(options_token)
+        _fast_build.reset(token)
         if log_to_file:
-            mod_logger.removeHandler(fh)
-            grb_logger.removeHandler(fh)
             fh.close()
 
 
@@ -107,13 +298,21 @@ def optimod(mod_logger=None):
     def optimod_decorator(func):
         @functools.wraps(func)
         def optimod_decorated(
-            *args, verbose=True, logfile=None, solver_params=None, **kwargs
+            *args,
+            verbose=True,
+            logfile=None,
+            solver_params=None,
+            env_pool=None,
+            fast_build=False,
+            **kwargs,
         ):
             with _mod_context(
                 mod_logger=mod_logger,
                 log_to_console=verbose,
                 log_to_file=logfile,
                 user_params=solver_params,
+                env_pool=env_pool,
+                fast_build=fast_build,
             ) as create_env:
                 return func(*args, create_env=create_env, **kwargs)
 
@@ -10,7 +10,7 @@ import gurobipy_pandas as gppd
 import pandas as pd
 from gurobipy import GRB
 
-from gurobi_optimods.utils import optimod
+from gurobi_optimods.utils import names_enabled, optimod
 
 logger = logging.getLogger(__name__)
 
@@ -43,13 +43,19 @@ def solve_workforce_scheduling(
     :return: Assigned shifts as a subset of the preferences dataframe
     :rtype: :class:`pd.DataFrame`
     """
+    names = names_enabled()
     with create_env() as env, gp.Model(env=env) as m:
 
         # Create binary variables for all valid shift assignments and
         # create preference maximization objective
         m.ModelSense = GRB.MAXIMIZE
-        assignments = preferences.set_index(["Worker", "Shift"]).gppd.add_vars(
-            m, obj="Preference", vtype=GRB.BINARY, name="assign"
+        assignments = preferences.set_index(["Worker", "Shift"])
+        assignments["assign"] = gppd.add_vars(
+            m,
+            assignments,
+            obj="Preference",
+            vtype=GRB.BINARY,
+            name="assign" if names else None,
         )
 
         # Enforce shift coverage requirements
@@ -58,7 +64,7 @@ def solve_workforce_scheduling(
             assignments.groupby("Shift")["assign"].sum(),
             GRB.EQUAL,
             shift_requirements.set_index("Shift")["Required"],
-            name="requirements",
+            name="requirements" if names else None,
         )
 
         if rolling_limits:
@@ -77,7 +83,7 @@ def solve_workforce_scheduling(
                     ].sum()
                     m.addConstr(
                         expr <= max_shifts,
-                        name=f"rolling[{worker},{entry}]",
+                        name=f"rolling[{worker},{entry}]" if names else "",
                     )
                     # TODO test and implement lower limit
 
@@ -89,14 +95,14 @@ def solve_workforce_scheduling(
                 assignments.groupby("Worker")["assign"].sum(),
                 GRB.LESS_EQUAL,
                 worker_limits.set_index("Worker")["MaxShifts"],
-                name="max_shifts",
+                name="max_shifts" if names else None,
             )
             gppd.add_constrs(
                 m,
                 assignments.groupby("Worker")["assign"].sum(),
                 GRB.GREATER_EQUAL,
                 worker_limits.set_index("Worker")["MinShifts"],
-                name="min_shifts",
+                name="min_shifts" if names else None,
             )
 
         # Solve the model and return the shift assignments as a subset of the
@@ -0,0 +1,95 @@
+import os
+import unittest
+
+import numpy as np
+import scipy.sparse as sp
+from numpy.testing import assert_array_equal
+
+from gurobi_optimods.batch import solve_many
+from gurobi_optimods.mwis import maximum_weighted_independent_set
+from gurobi_optimods.qubo import solve_qubo
+from gurobi_optimods.utils import optimod
+
+from .test_mwis import get_adjacency_matrix
+
+
+class TestSolveMany(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(seed=0)
+        self.instances = [
+            (get_adjacency_matrix(10, 0.4, seed), rng.integers(1, 100, size=10))
+            for seed in range(6)
+        ]
+        self.expected = [
+            maximum_weighted_independent_set(*instance, verbose=False)
+            for instance in self.instances
+        ]
+
+    def test_threads(self):
+        results = solve_many(
+            maximum_weighted_independent_set, self.instances, workers=3
+        )
+        self.assertEqual(len(results), len(self.instances))
+        for result, expected in zip(results, self.expected):
+            self.assertTrue(result.success)
+            assert_array_equal(result.result, expected)
+
+    def test_processes(self):
+        results = solve_many(
+            maximum_weighted_independent_set,
+            self.instances,
+            workers=2,
+            executor="process",
+        )
+        for result, expected in zip(results, self.expected):
+            self.assertTrue(result.success)
+            assert_array_equal(result.result, expected)
+
+    def test_keyword_inputs(self):
+        instances = [
+            {"adjacency_matrix": adjacency_matrix, "weights": weights}
+            for adjacency_matrix, weights in self.instances
+        ]
+        results = solve_many(maximum_weighted_independent_set, instances)
+        for result, expected in zip(results, self.expected):
+            assert_array_equal(result.result, expected)
+
+    def test_errors(self):
+        # Failures are reported per instance and don't stop the batch
+        instances = [
+            np.array([[-1, 2], [0, -1]]),
+            np.ones((2, 3)),
+            sp.coo_matrix(np.array([[1, -3], [0, 1]])),
+        ]
+        results = solve_many(solve_qubo, instances, workers=2)
+        self.assertEqual([r.success for r in results], [True, False, True])
+        self.assertIsInstance(results[1].error, ValueError)
+        self.assertEqual(results[0].result.objective_value, -1.0)
+        self.assertEqual(results[2].result.objective_value, -1.0)
+
+    def test_threads_split(self):
+        # Gurobi threads are divided between workers, unless given by the user
+
+        @optimod()
+        def mod(i, *, create_env):
+            with create_env() as env:
+                return env.getParam("Threads"), env.getParam("Seed")
+
+        results = solve_many(mod, range(4), workers=2)
+        cpu_count = os.cpu_count() or 1
+        for result in results:
+            self.assertEqual(result.result, (max(1, cpu_count // 2), 0))
+
+        results = solve_many(
+            mod, range(4), workers=2, solver_params={"Threads": 3, "Seed": 7}
+        )
+        for result in results:
+            self.assertEqual(result.result, (3, 7))
+
+    def test_not_optimod(self):
+        with self.assertRaises(TypeError):
+            solve_many(np.sum, [np.ones(3)])
+
+    def test_bad_executor(self):
+        with self.assertRaises(ValueError):
+            solve_many(solve_qubo, [np.ones((2, 2))], executor="cluster")
@@ -16,6 +16,8 @@ except ImportError:
 
 from gurobi_optimods.bipartite_matching import maximum_bipartite_matching
 
+from .utils import check_default_names, recorded_names
+
 
 def random_bipartite(n1, n2, p, seed):
     nodes1 = np.arange(n1)
@@ -197,6 +199,35 @@ class TestBipartiteMatchingPandas(unittest.TestCase):
         self.assert_is_unweighted_matching(matching, columns=["n1", "n2"])
         assert_frame_equal(matching, expected_result)
 
+    def test_simple_fast_build(self):
+        # Same result when the model is built without names
+        frame = pd.DataFrame(
+            [
+                {"n1": "p1", "n2": "j1", "other": "a"},
+                {"n1": "p1", "n2": "j2", "other": "b"},
+                {"n1": "p2", "n2": "j2", "other": "c"},
+                {"n1": "p2", "n2": "j3", "other": "d"},
+                {"n1": "p3", "n2": "j3", "other": "e"},
+            ]
+        )
+        expected_result = pd.DataFrame(
+            [
+                {"n1": "p1", "n2": "j1", "other": "a"},
+                {"n1": "p2", "n2": "j2", "other": "c"},
+                {"n1": "p3", "n2": "j3", "other": "e"},
+            ]
+        )
+
+        with recorded_names() as names:
+            matching = maximum_bipartite_matching(frame, "n1", "n2", fast_build=True)
+
+        self.assertTrue(check_default_names(names))
+
+        self.assertIsInstance(matching, pd.DataFrame)
+        self.assertIsNot(matching, frame)
+        self.assert_is_unweighted_matching(matching, columns=["n1", "n2"])
+        assert_frame_equal(matching, expected_result)
+
 
 @unittest.skipIf(nx is None, "networkx is not installed")
 class TestBipartiteMatchingNetworkx(unittest.TestCase):
@@ -274,3 +305,25 @@ class TestBipartiteMatchingNetworkx(unittest.TestCase):
         self.assertEqual(matching.number_of_nodes(), 6)
         self.assert_is_unweighted_matching(matching)
         self.assertEqual(set(matching.edges), {(0, 3), (1, 4), (2, 5)})
+
+    def test_known_fast_build(self):
+        # Same solution when the model is built without names
+        graph = nx.Graph()
+        graph.add_nodes_from(range(6))
+        edges = [(0, 3), (0, 4), (1, 4), (1, 5), (2, 5)]
+        graph.add_edges_from(edges)
+        nodes1 = [0, 1, 2]
+        nodes2 = [3, 4, 5]
+
+        with recorded_names() as names:
+            matching = maximum_bipartite_matching(
+                graph, nodes1, nodes2, fast_build=True
+            )
+
+        self.assertTrue(check_default_names(names))
+
+        self.assertIsInstance(matching, nx.Graph)
+        self.assertIsNot(matching, graph)
+        self.assertEqual(matching.number_of_nodes(), 6)
+        self.assert_is_unweighted_matching(matching)
+        self.assertEqual(set(matching.edges), {(0, 3), (1, 4), (2, 5)})
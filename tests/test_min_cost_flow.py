@@ -17,6 +17,7 @@ from .test_graph_utils import (
     check_solution_scipy,
     check_solution_networkx,
 )
+from .utils import check_default_names, recorded_names
 
 
 class TestMinCostFlow(unittest.TestCase):
@@ -29,6 +30,16 @@ class TestMinCostFlow(unittest.TestCase):
         self.assertIsInstance(sol, pd.Series)
         self.assertTrue(check_solution_pandas(sol, [candidate]))
 
+    def test_pandas_fast_build(self):
+        edge_data, node_data = datasets.load_graph()
+        with recorded_names() as names:
+            cost, sol = mcf.min_cost_flow(edge_data, node_data, fast_build=True)
+        self.assertTrue(check_default_names(names))
+        self.assertEqual(cost, 31)
+        self.assertEqual(sol.name, "flow")
+        candidate = {(0, 1): 1.0, (0, 2): 1.0, (1, 3): 1.0, (2, 4): 2.0, (4, 5): 2.0}
+        self.assertTrue(check_solution_pandas(sol[sol > 0], [candidate]))
+
     def test_infeasible(self):
         edge_data, node_data = datasets.load_graph()
         # Add a node requesting more flow than is available.
@@ -52,6 +63,21 @@ class TestMinCostFlow(unittest.TestCase):
         self.assertIsInstance(sol, sp.spmatrix)
         self.assertTrue(check_solution_scipy(sol, [candidate]))
 
+    def test_scipy_isolated_node(self):
+        # The last node has no edges
+        G = sp.coo_matrix(([1, 1], ([0, 1], [1, 2])), shape=(4, 4))
+        cap = sp.coo_matrix(([2, 2], ([0, 1], [1, 2])), shape=(4, 4))
+        cost = sp.coo_matrix(([1, 3], ([0, 1], [1, 2])), shape=(4, 4))
+        demands = np.array([-2, 0, 2, 0])
+        for backend in ["gurobi", "network_simplex"]:
+            with self.subTest(backend=backend):
+                obj, sol = mcf.min_cost_flow_scipy(
+                    G, cap, cost, demands, backend=backend
+                )
+                self.assertEqual(obj, 8)
+                self.assertEqual(sol.shape, (4, 4))
+                self.assertEqual(sol.toarray()[[0, 1], [1, 2]].tolist(), [2, 2])
+
     @unittest.skipIf(nx is None, "networkx is not installed")
     def test_networkx(self):
         G = datasets.load_graph_networkx()
@@ -83,6 +109,29 @@ class TestMinCostFlow(unittest.TestCase):
         self.assertIsInstance(sol, nx.Graph)
         self.assertTrue(check_solution_networkx(sol, [expected]))
 
+    @unittest.skipIf(nx is None, "networkx is not installed")
+    def test_networkx_fast_build(self):
+        G = datasets.load_graph_networkx()
+        with recorded_names() as names:
+            cost, sol = mcf.min_cost_flow_networkx(G, fast_build=True)
+        self.assertTrue(check_default_names(names))
+        self.assertEqual(cost, 31)
+        expected = {
+            (0, 1): {"flow": 1.0},
+            (0, 2): {"flow": 1.0},
+            (1, 3): {"flow": 1.0},
+            (2, 4): {"flow": 2.0},
+            (4, 5): {"flow": 2.0},
+        }
+        self.assertTrue(check_solution_networkx(sol, [expected]))
+
+    @unittest.skipIf(nx is None, "networkx is not installed")
+    def test_networkx_infeasible(self):
+        G = datasets.load_graph_networkx()
+        G.nodes[5]["demand"] = 10
+        with self.assertRaisesRegex(ValueError, "Unsatisfiable flows"):
+            mcf.min_cost_flow_networkx(G)
+
 
 class TestMinCostFlow2(unittest.TestCase):
     def test_pandas(self):
@@ -174,3 +223,144 @@ class TestMinCostFlow2(unittest.TestCase):
             (3, "t"): {"flow": 14.0},
         }
         self.assertTrue(check_solution_networkx(sol, [candidate, candidate2]))
+
+
+class TestNetworkSimplex(unittest.TestCase):
+    def test_pandas(self):
+        edge_data, node_data = datasets.load_graph()
+        cost, sol = mcf.min_cost_flow(edge_data, node_data, backend="network_simplex")
+        self.assertEqual(cost, 31)
+        self.assertIsInstance(sol, pd.Series)
+        self.assertEqual(sol.name, "flow")
+        self.assertTrue(sol.index.equals(edge_data.index))
+        candidate = {(0, 1): 1.0, (0, 2): 1.0, (1, 3): 1.0, (2, 4): 2.0, (4, 5): 2.0}
+        self.assertTrue(check_solution_pandas(sol[sol > 0], [candidate]))
+
+    def test_pandas2(self):
+        edge_data, node_data = datasets.load_graph2()
+        cost, sol = mcf.min_cost_flow(edge_data, node_data, backend="network_simplex")
+        self.assertEqual(cost, 150)
+        self.assertAlmostEqual((sol * edge_data["cost"]).sum(), 150)
+
+    def test_infeasible(self):
+        edge_data, node_data = datasets.load_graph()
+        node_data["demand"].values[-1] = 10.0
+        with self.assertRaisesRegex(ValueError, "Unsatisfiable flows"):
+            mcf.min_cost_flow(edge_data, node_data, backend="network_simplex")
+
+    def test_infeasible_balanced(self):
+        # Demands sum to zero, but capacities are too small
+        edge_data, node_data = datasets.load_graph()
+        edge_data["capacity"] = 0.5
+        with self.assertRaisesRegex(ValueError, "Unsatisfiable flows"):
+            mcf.min_cost_flow(edge_data, node_data, backend="network_simplex")
+
+    def test_infeasible_unbounded(self):
+        # Unsatisfiable demands are reported even if a negative cost cycle
+        # (or self loop) has infinite capacity
+        demands = [-1, 0, 0, 1]
+        cycles = {"cycle": ([1, 2], [2, 1]), "loop": ([1], [1])}
+        for name, (sources, targets) in cycles.items():
+            with self.subTest(cycle=name):
+                capacities = [np.inf] * len(sources)
+                costs = [-1] * len(sources)
+                with self.assertRaisesRegex(ValueError, "Unsatisfiable flows"):
+                    mcf._network_simplex(sources, targets, capacities, costs, demands)
+                # Unbounded once the demands can be met
+                with self.assertRaisesRegex(ValueError, "Unbounded flows"):
+                    mcf._network_simplex(
+                        sources + [0],
+                        targets + [3],
+                        capacities + [1],
+                        costs + [1],
+                        demands,
+                    )
+
+    def test_unknown_backend(self):
+        edge_data, node_data = datasets.load_graph()
+        with self.assertRaisesRegex(ValueError, "Unknown backend"):
+            mcf.min_cost_flow(edge_data, node_data, backend="cost_scaling")
+
+    def test_scipy(self):
+        G, cap, cost, demands = datasets.load_graph_scipy()
+        cost, sol = mcf.min_cost_flow_scipy(
+            G, cap, cost, demands, backend="network_simplex"
+        )
+        self.assertEqual(cost, 31)
+        candidate = np.array(
+            [
+                [0.0, 1.0, 1.0, 0.0, 0.0, 0.0],
+                [0.0, 0.0, 0.0, 1.0, 0.0, 0.0],
+                [0.0, 0.0, 0.0, 0.0, 2.0, 0.0],
+                [0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
+                [0.0, 0.0, 0.0, 0.0, 0.0, 2.0],
+            ]
+        )
+        self.assertIsInstance(sol, sp.spmatrix)
+        self.assertTrue(check_solution_scipy(sol, [candidate]))
+
+    def test_scipy2(self):
+        G, cap, cost, demands = datasets.load_graph2_scipy()
+        cost, sol = mcf.min_cost_flow_scipy(
+            G, cap, cost, demands, backend="network_simplex"
+        )
+        self.assertEqual(cost, 150)
+        candidate = np.array(
+            [
+                [0.0, 12.0, 8.0, 0.0, 0.0],
+                [0.0, 0.0, 8.0, 4.0, 0.0],
+                [0.0, 0.0, 0.0, 11.0, 5.0],
+                [0.0, 0.0, 0.0, 0.0, 10.0],
+            ]
+        )
+        candidate2 = np.array(
+            [
+                [0.0, 12.0, 8.0, 0.0, 0.0],
+                [0.0, 0.0, 8.0, 4.0, 0.0],
+                [0.0, 0.0, 0.0, 15.0, 1.0],
+                [0.0, 0.0, 0.0, 0.0, 14.0],
+            ]
+        )
+        self.assertTrue(check_solution_scipy(sol, [candidate, candidate2]))
+
+    @unittest.skipIf(nx is None, "networkx is not installed")
+    def test_networkx_renamed(self):
+        G = datasets.load_graph_networkx()
+        G = nx.relabel_nodes(G, {0: "s", 5: "t"})
+        cost, sol = mcf.min_cost_flow_networkx(G, backend="network_simplex")
+        self.assertEqual(cost, 31)
+        expected = {
+            ("s", 1): {"flow": 1.0},
+            ("s", 2): {"flow": 1.0},
+            (1, 3): {"flow": 1.0},
+            (2, 4): {"flow": 2.0},
+            (4, "t"): {"flow": 2.0},
+        }
+        self.assertIsInstance(sol, nx.Graph)
+        self.assertEqual(set(sol.nodes), set(G.nodes))
+        self.assertTrue(check_solution_networkx(sol, [expected]))
+
+    def test_random(self):
+        # Compare against the LP on random graphs with negative costs
+        rng = np.random.default_rng(42)
+        for _ in range(20):
+            G = sp.random(30, 30, density=0.2, random_state=rng, format="coo")
+            cap = G.copy()
+            cap.data = rng.integers(1, 10, G.nnz).astype(float)
+            costs = G.copy()
+            costs.data = rng.integers(-3, 10, G.nnz).astype(float)
+            demands = np.zeros(30)
+            demands[rng.integers(0, 30, 5)] -= 2
+            demands[rng.integers(0, 30, 5)] += 2
+            try:
+                expected, _ = mcf.min_cost_flow_scipy(G, cap, costs, demands)
+            except ValueError:
+                with self.assertRaisesRegex(ValueError, "Unsatisfiable flows"):
+                    mcf.min_cost_flow_scipy(
+                        G, cap, costs, demands, backend="network_simplex"
+                    )
+                continue
+            cost, _ = mcf.min_cost_flow_scipy(
+                G, cap, costs, demands, backend="network_simplex"
+            )
+            self.assertAlmostEqual(cost, expected)
@@ -1,11 +1,22 @@
+import io
+import os
+import re
 import unittest
+from contextlib import redirect_stdout
+from unittest import mock
 
 from itertools import combinations
 import scipy.sparse as sp
+import gurobipy as gp
 import numpy as np
 from numpy.testing import assert_array_equal
 
-from gurobi_optimods.mwis import maximum_weighted_independent_set
+from gurobi_optimods.mwis import (
+    _clique_cover,
+    _greedy_independent_set,
+    _symmetric_adjacency,
+    maximum_weighted_independent_set,
+)
 
 
 def get_adjacency_matrix(num_vertices, density, seed):
@@ -32,6 +43,11 @@ def get_adjacency_matrix(num_vertices, density, seed):
     return sp.csr_array((data, (rows, cols)), shape=(num_vertices, num_vertices))
 
 
+def is_independent(adjacency_matrix, vertices):
+    """Check that no two of the given vertices are adjacent"""
+    return adjacency_matrix.tocsr()[vertices][:, vertices].nnz == 0
+
+
 class TestMWIS(unittest.TestCase):
     def test_random_graph(self):
         for density in [np.random.random() for _ in range(5)]:
@@ -67,3 +83,285 @@ class TestMWIS(unittest.TestCase):
         mwis = maximum_weighted_independent_set(adjacency_matrix, weights)
         assert_array_equal(mwis, np.array([0, 2, 5, 7]))
         self.assertEqual(sum(weights[mwis]), 165)
+
+
+class TestMWISCliqueFormulation(unittest.TestCase):
+    def test_same_objective(self):
+        for density in [0.1, 0.3, 0.5, 0.8]:
+            with self.subTest(density=density):
+                adjacency_matrix = get_adjacency_matrix(30, density, seed=0)
+                weights = np.random.default_rng(0).integers(1, 100, size=30)
+                edge = maximum_weighted_independent_set(adjacency_matrix, weights)
+                clique = maximum_weighted_independent_set(
+                    adjacency_matrix, weights, formulation="clique"
+                )
+                self.assertEqual(weights[clique].sum(), weights[edge].sum())
+                self.assertTrue(is_independent(adjacency_matrix, clique))
+
+    def test_known_graph(self):
+        rows = [0, 0, 0, 1, 1, 2, 2, 3, 4, 4, 5, 6]
+        cols = [1, 3, 4, 3, 5, 3, 6, 7, 5, 7, 6, 7]
+        data = [1 for _ in range(12)]
+        adjacency_matrix = sp.csr_array((data, (rows, cols)), shape=(8, 8))
+        weights = np.array([2**i for i in range(8)])
+        mwis = maximum_weighted_independent_set(
+            adjacency_matrix, weights, formulation="clique"
+        )
+        assert_array_equal(mwis, np.array([0, 2, 5, 7]))
+
+    def test_empty_graph(self):
+        adjacency_matrix = get_adjacency_matrix(10, 0, seed=0)
+        weights = np.random.randint(1, 100, size=10)
+        mwis = maximum_weighted_independent_set(
+            adjacency_matrix, weights, formulation="clique"
+        )
+        self.assertEqual(len(mwis), 10)
+
+    def test_unknown_formulation(self):
+        adjacency_matrix = get_adjacency_matrix(10, 0.5, seed=0)
+        weights = np.ones(10)
+        with self.assertRaises(ValueError):
+            maximum_weighted_independent_set(
+                adjacency_matrix, weights, formulation="star"
+            )
+
+    def test_clique_cover(self):
+        for density in [0.1, 0.5, 1.0]:
+            with self.subTest(density=density):
+                adjacency = _symmetric_adjacency(
+                    get_adjacency_matrix(20, density, seed=1)
+                )
+                cliques = _clique_cover(adjacency)
+                covered = sp.csr_array(adjacency.shape, dtype=bool)
+                for clique in cliques:
+                    # Every clique is complete in the graph
+                    block = adjacency[clique][:, clique].toarray()
+                    self.assertTrue(np.all(block | np.eye(len(clique), dtype=bool)))
+                    covered = covered + sp.csr_array(
+                        np.isin(np.arange(20), clique)[:, None]
+                        & np.isin(np.arange(20), clique)[None, :]
+                    )
+                # Every edge is covered by some clique
+                self.assertEqual((adjacency > covered).nnz, 0)
+                if density == 1.0:
+                    self.assertEqual(len(cliques), 1)
+
+    def test_clique_cover_triangle_free(self):
+        # On a grid graph every edge is a clique by itself
+        path = sp.diags([np.ones(299)], [1], shape=(300, 300))
+        grid = sp.kron(sp.eye(300), path) + sp.kron(path, sp.eye(300))
+        adjacency = _symmetric_adjacency(grid)
+        cliques = _clique_cover(adjacency)
+        upper = sp.triu(adjacency, k=1, format="coo")
+        assert_array_equal(cliques, np.column_stack([upper.row, upper.col]))
+
+
+class TestMWISHeuristic(unittest.TestCase):
+    def test_heuristic_only(self):
+        for density in [0.0, 0.1, 0.3, 0.5, 1.0]:
+            with self.subTest(density=density):
+                adjacency_matrix = get_adjacency_matrix(30, density, seed=0)
+                weights = np.random.default_rng(0).integers(1, 100, size=30)
+                heuristic = maximum_weighted_independent_set(
+                    adjacency_matrix, weights, heuristic_only=True
+                )
+                optimal = maximum_weighted_independent_set(adjacency_matrix, weights)
+                self.assertTrue(is_independent(adjacency_matrix, heuristic))
+                self.assertLessEqual(weights[heuristic].sum(), weights[optimal].sum())
+                self.assertGreater(len(heuristic), 0)
+
+    def test_complete_graph(self):
+        # The heuristic is exact on complete and empty graphs
+        adjacency_matrix = get_adjacency_matrix(10, 1, seed=0)
+        weights = np.random.default_rng(0).permutation(10) + 1
+        mwis = maximum_weighted_independent_set(
+            adjacency_matrix, weights, heuristic_only=True
+        )
+        assert_array_equal(mwis, [np.argmax(weights)])
+
+    def test_swap(self):
+        # Greedy by weight over degree picks vertices 4 and 0. Vertex 1 is
+        # adjacent only to vertex 4 in this set, so it is swapped in.
+        rows = [0, 0, 1, 1, 2]
+        cols = [2, 3, 2, 4, 3]
+        adjacency_matrix = sp.csr_array((np.ones(5), (rows, cols)), shape=(5, 5))
+        weights = np.array([15, 19, 6, 4, 16])
+        mwis = maximum_weighted_independent_set(
+            adjacency_matrix, weights, heuristic_only=True
+        )
+        assert_array_equal(mwis, [0, 1])
+
+    def test_increasing_path(self):
+        # Weights increasing along a path: each parallel greedy round only
+        # settles the heaviest remaining vertices
+        num_vertices = 50000
+        adjacency_matrix = sp.diags(
+            np.ones(num_vertices - 1), 1, shape=(num_vertices, num_vertices)
+        ).tocsr()
+        weights = np.arange(1, num_vertices + 1)
+        mwis = maximum_weighted_independent_set(
+            adjacency_matrix, weights, heuristic_only=True
+        )
+        assert_array_equal(mwis, np.arange(1, num_vertices, 2))
+
+    def test_greedy_rounds(self):
+        # The result does not depend on when the sequential pass takes over
+        adjacency = _symmetric_adjacency(get_adjacency_matrix(60, 0.1, seed=1))
+        priority = np.random.default_rng(1).random(60)
+        candidates = priority > 0.2
+        expected = _greedy_independent_set(adjacency, priority, candidates, 100)
+        for max_rounds in [0, 1, 2]:
+            with self.subTest(max_rounds=max_rounds):
+                assert_array_equal(
+                    _greedy_independent_set(
+                        adjacency, priority, candidates, max_rounds
+                    ),
+                    expected,
+                )
+
+    def test_no_warm_start(self):
+        rows = [0, 0, 0, 1, 1, 2, 2, 3, 4, 4, 5, 6]
+        cols = [1, 3, 4, 3, 5, 3, 6, 7, 5, 7, 6, 7]
+        data = [1 for _ in range(12)]
+        adjacency_matrix = sp.csr_array((data, (rows, cols)), shape=(8, 8))
+        weights = np.array([2**i for i in range(8)])
+        mwis = maximum_weighted_independent_set(
+            adjacency_matrix, weights, warm_start=False
+        )
+        assert_array_equal(mwis, np.array([0, 2, 5, 7]))
+
+
+def disjoint_union(*adjacency_matrices):
+    """Adjacency matrix of the disjoint union of the given graphs"""
+    return sp.csr_array(sp.block_diag(adjacency_matrices))
+
+
+class TestMWISDecomposition(unittest.TestCase):
+    def setUp(self):
+        # Isolated vertex, single edge, triangle, and two random graphs
+        self.adjacency_matrix = disjoint_union(
+            sp.csr_array((1, 1)),
+            get_adjacency_matrix(2, 1, seed=0),
+            get_adjacency_matrix(3, 1, seed=0),
+            get_adjacency_matrix(12, 0.3, seed=1),
+            get_adjacency_matrix(15, 0.4, seed=2),
+        )
+        self.weights = np.random.default_rng(0).integers(1, 100, size=33)
+
+    def test_same_objective(self):
+        expected = maximum_weighted_independent_set(
+            self.adjacency_matrix, self.weights, decompose=False
+        )
+        for formulation in ["edge", "clique"]:
+            for workers in [1, 2]:
+                with self.subTest(formulation=formulation, workers=workers):
+                    mwis = maximum_weighted_independent_set(
+                        self.adjacency_matrix,
+                        self.weights,
+                        formulation=formulation,
+                        workers=workers,
+                    )
+                    self.assertTrue(is_independent(self.adjacency_matrix, mwis))
+                    self.assertEqual(
+                        self.weights[mwis].sum(), self.weights[expected].sum()
+                    )
+
+    def test_worker_threads(self):
+        # Gurobi threads are divided between workers, unless given by the user
+        threads = max(1, (os.cpu_count() or 1) // 2)
+        for solver_params, expected in [(None, threads), ({"Threads": 3}, 3)]:
+            with self.subTest(solver_params=solver_params):
+                with redirect_stdout(io.StringIO()) as buffer_stdout:
+                    maximum_weighted_independent_set(
+                        self.adjacency_matrix,
+                        self.weights,
+                        workers=2,
+                        solver_params=solver_params,
+                    )
+                self.assertEqual(
+                    set(
+                        re.findall(
+                            r"Set parameter Threads to value (\d+)",
+                            buffer_stdout.getvalue(),
+                        )
+                    ),
+                    {str(expected)},
+                )
+
+    def test_trivial_components(self):
+        # Cliques are solved without calling Gurobi
+        adjacency_matrix = disjoint_union(
+            sp.csr_array((2, 2)),
+            get_adjacency_matrix(2, 1, seed=0),
+            get_adjacency_matrix(4, 1, seed=0),
+            sp.csr_array((1, 1)),
+        )
+        weights = np.array([1, 2, 5, 3, 4, 9, 7, 8, 6])
+        with redirect_stdout(io.StringIO()) as buffer_stdout, mock.patch(
+            "gurobipy.Env", wraps=gp.Env
+        ) as env:
+            mwis = maximum_weighted_independent_set(adjacency_matrix, weights)
+        assert_array_equal(mwis, [0, 1, 2, 5, 8])
+        self.assertNotIn("Gurobi Optimizer", buffer_stdout.getvalue())
+        env.assert_not_called()
+
+    def test_nonpositive_weights(self):
+        adjacency_matrix = disjoint_union(
+            sp.csr_array((2, 2)), get_adjacency_matrix(2, 1, seed=0)
+        )
+        weights = np.array([-1, 2, -3, -4])
+        mwis = maximum_weighted_independent_set(adjacency_matrix, weights)
+        assert_array_equal(mwis, [1])
+
+
+class TestMWISInputFormats(unittest.TestCase):
+    def setUp(self):
+        self.upper = get_adjacency_matrix(12, 0.4, seed=0)
+        self.weights = np.random.default_rng(0).integers(1, 100, size=12)
+
+    def solve(self, adjacency_matrix):
+        # Returns the solution and the number of rows in the model
+        with redirect_stdout(io.StringIO()) as buffer_stdout:
+            mwis = maximum_weighted_independent_set(
+                adjacency_matrix, self.weights, warm_start=False, decompose=False
+            )
+        num_rows = re.search(r"model with (\d+) rows", buffer_stdout.getvalue())
+        return mwis, int(num_rows.group(1))
+
+    def test_formats(self):
+        expected, num_rows = self.solve(self.upper)
+        self.assertEqual(num_rows, self.upper.nnz)
+        symmetric = self.upper + self.upper.T
+        lower = self.upper.T
+        inputs = {
+            "symmetric": symmetric,
+            "lower": lower,
+            "csc_array": sp.csc_array(symmetric),
+            "coo_array": sp.coo_array(symmetric),
+            "csr_matrix": sp.csr_matrix(symmetric),
+            "dense": symmetric.toarray(),
+            "duplicates": sp.coo_array(
+                (
+                    np.ones(2 * self.upper.nnz),
+                    (
+                        np.tile(self.upper.tocoo().row, 2),
+                        np.tile(self.upper.tocoo().col, 2),
+                    ),
+                ),
+                shape=self.upper.shape,
+            ),
+            "self_loops": self.upper + sp.eye(12),
+        }
+        for name, adjacency_matrix in inputs.items():
+            with self.subTest(input=name):
+                mwis, rows = self.solve(adjacency_matrix)
+                assert_array_equal(mwis, expected)
+                self.assertEqual(rows, num_rows)
+
+    def test_shape_mismatch(self):
+        with self.assertRaises(ValueError):
+            maximum_weighted_independent_set(self.upper, self.weights[:-1])
+
+    def test_keyword_only(self):
+        with self.assertRaises(TypeError):
+            maximum_weighted_independent_set(self.upper, self.weights, "clique")
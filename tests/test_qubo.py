@@ -1,9 +1,19 @@
+import queue
 import unittest
+from unittest import mock
 import numpy as np
 from numpy.testing import assert_array_equal
 import scipy.sparse as sp
 
-from gurobi_optimods.qubo import solve_qubo
+from gurobi_optimods.qubo import (
+    QuboProgress,
+    solve_qubo,
+    solve_qubo_batch,
+    _check_termination,
+    _fix_persistent,
+    _objective_terms,
+    _reset_callback,
+)
 
 
 class TestQubo(unittest.TestCase):
@@ -54,3 +64,274 @@ class TestQubo(unittest.TestCase):
         result = solve_qubo(Q)
         self.assertEqual(result.objective_value, -2)
         assert_array_equal(result.solution, np.array([1, 0, 1]))
+
+    def test_duplicates(self):
+        # Duplicate COO entries are summed, and Q[0, 1] cancels Q[1, 0]
+        data = [-1, -1, 2, -2, 3, 1]
+        row = [0, 0, 0, 1, 1, 2]
+        col = [0, 0, 1, 0, 2, 2]
+        Q = sp.coo_matrix((data, (row, col)), shape=(3, 3))
+        result = solve_qubo(Q)
+        self.assertEqual(result.objective_value, -2)
+        assert_array_equal(result.solution, np.array([1, 0, 0]))
+
+
+class TestQuboObjectiveTerms(unittest.TestCase):
+    def test_random(self):
+        rng = np.random.default_rng(0)
+        Q = rng.integers(-5, 5, size=(8, 8)) * (rng.random((8, 8)) < 0.5)
+        for coeff_matrix in [Q, sp.coo_array(Q), sp.csc_matrix(Q)]:
+            quadratic, linear = _objective_terms(coeff_matrix)
+            self.assertFalse(quadratic.diagonal().any())
+            for _ in range(10):
+                x = rng.integers(0, 2, size=8)
+                self.assertEqual(x @ quadratic @ x + linear @ x, x @ Q @ x)
+
+
+def brute_force_optimum(Q):
+    n = Q.shape[0]
+    X = (np.arange(2**n)[:, None] >> np.arange(n)) & 1
+    return np.einsum("ki,ij,kj->k", X, Q, X).min()
+
+
+class TestQuboHeuristics(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.Q = rng.integers(-5, 5, size=(12, 12)) * (rng.random((12, 12)) < 0.4)
+        self.optimum = brute_force_optimum(self.Q)
+
+    def test_heuristics(self):
+        for method in ["anneal", "tabu"]:
+            for Q in [self.Q, sp.coo_matrix(self.Q)]:
+                with self.subTest(method=method, sparse=sp.issparse(Q)):
+                    result = solve_qubo(Q, method=method, seed=0)
+                    self.assertEqual(result.objective_value, self.optimum)
+                    self.assertEqual(
+                        result.solution @ self.Q @ result.solution,
+                        result.objective_value,
+                    )
+                    self.assertTrue(np.isin(result.solution, [0, 1]).all())
+
+    def test_reproducible(self):
+        for method in ["anneal", "tabu"]:
+            with self.subTest(method=method):
+                first = solve_qubo(self.Q, method=method, seed=42)
+                second = solve_qubo(self.Q, method=method, seed=42)
+                assert_array_equal(first.solution, second.solution)
+
+    def test_zero(self):
+        for method in ["anneal", "tabu"]:
+            with self.subTest(method=method):
+                result = solve_qubo(np.zeros((3, 3)), method=method)
+                self.assertEqual(result.objective_value, 0)
+
+    def test_mip_start(self):
+        for mip_start in ["anneal", "tabu", np.ones(12)]:
+            with self.subTest(mip_start=mip_start):
+                result = solve_qubo(self.Q, mip_start=mip_start)
+                self.assertEqual(result.objective_value, self.optimum)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            solve_qubo(self.Q, method="genetic")
+        with self.assertRaises(ValueError):
+            solve_qubo(self.Q, mip_start="genetic")
+        with self.assertRaises(ValueError):
+            solve_qubo(self.Q, method="tabu", mip_start=np.ones(12))
+        with self.assertRaises(TypeError):
+            # Options after the time limit are keyword-only
+            solve_qubo(self.Q, 10, "tabu")
+
+
+class TestQuboMultiStart(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.Q = rng.integers(-5, 5, size=(12, 12)) * (rng.random((12, 12)) < 0.4)
+        self.optimum = brute_force_optimum(self.Q)
+
+    def test_heuristic(self):
+        result = solve_qubo(self.Q, method="tabu", seed=3, starts=4, workers=2)
+        self.assertEqual(result.objective_value, self.optimum)
+        self.assertEqual(len(result.solution_pool), 4)
+        objectives = [r.objective_value for r in result.solution_pool]
+        self.assertEqual(objectives, sorted(objectives))
+        self.assertIs(result.solution_pool[0].solution, result.solution)
+
+        # The same seed gives the same pool
+        again = solve_qubo(self.Q, method="tabu", seed=3, starts=4, workers=2)
+        for first, second in zip(result.solution_pool, again.solution_pool):
+            assert_array_equal(first.solution, second.solution)
+
+    def test_gurobi(self):
+        result = solve_qubo(self.Q, seed=0, starts=2, workers=2)
+        self.assertEqual(result.objective_value, self.optimum)
+        self.assertEqual(len(result.solution_pool), 2)
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            solve_qubo(self.Q, time_limit=0, starts=2, workers=2)
+
+    def test_solver_params(self):
+        # Parameters of the call apply to every start
+        with self.assertRaises(ValueError):
+            solve_qubo(self.Q, starts=2, workers=2, solver_params={"TimeLimit": 0})
+
+
+class TestQuboProgress(unittest.TestCase):
+    def test_callable(self):
+        # Hard enough to not be solved within the time limit
+        rng = np.random.default_rng(1)
+        Q = rng.integers(-10, 10, size=(60, 60))
+        events = []
+        solve_qubo(Q, time_limit=1.5, progress=events.append, progress_interval=0.25)
+        self.assertGreaterEqual(len(events), 3)
+        for event in events:
+            self.assertIsInstance(event, QuboProgress)
+            self.assertLessEqual(event.dual_bound, event.primal_bound)
+        runtimes = [event.runtime for event in events[:-1]]
+        self.assertTrue(all(np.diff(runtimes) >= 0.25))
+
+        # Final event
+        self.assertGreater(events[-1].gap, 0)
+        self.assertGreater(events[-1].solution_count, 0)
+
+    def test_queue(self):
+        events = queue.Queue()
+        result = solve_qubo(np.array([[1, -3], [0, 1]]), progress=events)
+        final = None
+        while not events.empty():
+            final = events.get_nowait()
+        self.assertEqual(final.primal_bound, result.objective_value)
+        self.assertEqual(final.gap, 0.0)
+
+    def test_multi_start(self):
+        with self.assertRaises(ValueError):
+            solve_qubo(np.eye(2), starts=2, progress=print)
+
+
+class TestQuboTermination(unittest.TestCase):
+    def setUp(self):
+        # Not solved to optimality within the time limit
+        rng = np.random.default_rng(1)
+        self.Q = rng.integers(-10, 10, size=(60, 60))
+        self.time_limit = 10
+
+    def solve(self, **kwargs):
+        events = []
+        result = solve_qubo(
+            self.Q, time_limit=self.time_limit, progress=events.append, **kwargs
+        )
+        return result, events[-1]
+
+    def test_gap(self):
+        result, final = self.solve(gap=0.5)
+        self.assertLessEqual(final.gap, 0.5)
+        self.assertLess(final.runtime, self.time_limit)
+
+    def test_target(self):
+        result, final = self.solve(target=-1500)
+        self.assertLessEqual(result.objective_value, -1500)
+        self.assertLess(final.runtime, self.time_limit)
+
+    def test_stall(self):
+        result, final = self.solve(stall_time=0.5)
+        self.assertGreater(final.gap, 0)
+        self.assertLess(final.runtime, self.time_limit)
+
+    def test_stall_before_solution(self):
+        # The stall clock only starts with the first solution
+        model = mock.Mock()
+        _reset_callback(model, stall_time=0.5)
+        _check_termination(model, runtime=2.0)
+        model.terminate.assert_not_called()
+        model._last_improvement_time = 1.0
+        _check_termination(model, runtime=2.0)
+        model.terminate.assert_called_once()
+
+
+class TestQuboPreprocessing(unittest.TestCase):
+    def setUp(self):
+        # Large diagonal entries on the first half make those variables
+        # persistent, the second half is left free
+        rng = np.random.default_rng(2)
+        self.Q = rng.integers(-3, 3, size=(12, 12))
+        self.Q[np.arange(6), np.arange(6)] = [40, -40, 40, -40, 40, -40]
+        self.optimum = brute_force_optimum(self.Q)
+
+    def test_fixing(self):
+        quadratic, linear = _objective_terms(self.Q)
+        values, free, reduced, reduced_linear, constant = _fix_persistent(
+            quadratic, linear
+        )
+        assert_array_equal(free[:6], False)
+        assert_array_equal(values[:6], [0, 1, 0, 1, 0, 1])
+        self.assertEqual(reduced.shape, (free.sum(), free.sum()))
+        self.assertEqual(reduced_linear.shape, (free.sum(),))
+
+        # Objective of the reduced problem matches on the free variables
+        rng = np.random.default_rng(0)
+        for _ in range(10):
+            x = values.copy()
+            x[free] = rng.integers(0, 2, size=free.sum())
+            y = x[free]
+            self.assertAlmostEqual(
+                y @ reduced @ y + reduced_linear @ y + constant, x @ self.Q @ x
+            )
+
+    def test_solve(self):
+        for method in ["gurobi", "anneal", "tabu"]:
+            for Q in [self.Q, sp.coo_matrix(self.Q)]:
+                with self.subTest(method=method, sparse=sp.issparse(Q)):
+                    result = solve_qubo(Q, method=method, seed=0, preprocess=True)
+                    self.assertEqual(result.objective_value, self.optimum)
+                    self.assertEqual(result.solution.shape, (12,))
+                    self.assertEqual(
+                        result.solution @ self.Q @ result.solution, self.optimum
+                    )
+
+    def test_mip_start(self):
+        result = solve_qubo(self.Q, mip_start=np.ones(12), preprocess=True)
+        self.assertEqual(result.objective_value, self.optimum)
+
+    def test_all_fixed(self):
+        Q = np.array([[0, -1, -2], [0, -3, 3], [0, 0, 2]])
+        result = solve_qubo(Q, preprocess=True)
+        self.assertEqual(result.objective_value, -4)
+        assert_array_equal(result.solution, np.array([1, 1, 0]))
+
+
+class TestQuboBatch(unittest.TestCase):
+    def setUp(self):
+        # Same sparsity pattern, different coefficients
+        rng = np.random.default_rng(3)
+        pattern = rng.random((10, 10)) < 0.4
+        self.matrices = [rng.integers(-5, 5, size=(10, 10)) * pattern for _ in range(5)]
+
+    def test_batch(self):
+        for warm_start in [True, False]:
+            for sparse in [True, False]:
+                with self.subTest(warm_start=warm_start, sparse=sparse):
+                    matrices = [
+                        sp.coo_matrix(Q) if sparse else Q for Q in self.matrices
+                    ]
+                    results = solve_qubo_batch(matrices, warm_start=warm_start)
+                    self.assertEqual(len(results), 5)
+                    for Q, result in zip(self.matrices, results):
+                        self.assertEqual(result.objective_value, brute_force_optimum(Q))
+                        self.assertEqual(
+                            result.solution @ Q @ result.solution,
+                            result.objective_value,
+                        )
+
+    def test_empty(self):
+        self.assertEqual(solve_qubo_batch([]), [])
+
+    def test_sizes(self):
+        with self.assertRaises(ValueError):
+            solve_qubo_batch([np.eye(2), np.eye(3)])
+        with self.assertRaises(ValueError):
+            solve_qubo_batch([np.ones((2, 3))])
+
+    def test_keyword_only(self):
+        with self.assertRaises(TypeError):
+            solve_qubo_batch([np.eye(2)], 10, False)
@@ -1,9 +1,15 @@
+import os
+import tempfile
 import unittest
 
 import numpy as np
+import scipy.sparse as sp
+from gurobipy import GRB
 from numpy.testing import assert_allclose
 
-from gurobi_optimods.regression import LADRegression
+from gurobi_optimods.regression import LADRegression, QuantileRegression
+
+from .utils import check_default_names, recorded_names
 
 
 class TestLADRegression(unittest.TestCase):
@@ -32,3 +38,381 @@ class TestLADRegression(unittest.TestCase):
         # Check predictions are the right shape
         y_pred = reg.predict(np.random.random((30, 5)))
         self.assertEqual(y_pred.shape, (30,))
+
+
+def absolute_error(reg, X, y):
+    return np.abs(reg.predict(X) - y).sum()
+
+
+class TestLADRegressionChunked(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.X_train = rng.random((50, 4))
+        self.y_train = self.X_train @ np.array([1.0, -2.0, 0.5, 3.0]) + rng.normal(
+            size=50
+        )
+        self.reg = LADRegression()
+        self.reg.fit(self.X_train, self.y_train)
+        self.error = absolute_error(self.reg, self.X_train, self.y_train)
+
+    def test_chunks(self):
+        # Chunk size that does not divide the number of records
+        reg = LADRegression(chunk_size=7)
+        reg.fit(self.X_train, self.y_train)
+        assert_allclose(absolute_error(reg, self.X_train, self.y_train), self.error)
+
+    def test_chunk_names(self):
+        # Constraint names are numbered across chunks
+        with LADRegression(chunk_size=7, warm_start=True) as reg:
+            reg.fit(self.X_train, self.y_train)
+            names = reg._model.getAttr("ConstrName")
+        self.assertEqual(names, [f"fit[{i}]" for i in range(50)])
+
+    def test_memmap(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            path = os.path.join(tempdir, "X_train.npy")
+            np.save(path, self.X_train)
+            X_train = np.load(path, mmap_mode="r")
+            reg = LADRegression(chunk_size=10)
+            reg.fit(X_train, self.y_train)
+            del X_train
+        assert_allclose(absolute_error(reg, self.X_train, self.y_train), self.error)
+
+    def test_sparse(self):
+        reg = LADRegression(chunk_size=10)
+        reg.fit(sp.coo_array(self.X_train), self.y_train)
+        assert_allclose(absolute_error(reg, self.X_train, self.y_train), self.error)
+
+
+class TestLADRegressionSparse(unittest.TestCase):
+    def setUp(self):
+        # One-hot encoded features
+        rng = np.random.default_rng(0)
+        categories = rng.integers(0, 20, size=200)
+        self.X_dense = np.eye(20)[categories]
+        self.y_train = categories * 1.5 + rng.normal(size=200)
+
+    def test_sparse_formats(self):
+        dense = LADRegression()
+        dense.fit(self.X_dense, self.y_train)
+        error = absolute_error(dense, self.X_dense, self.y_train)
+        for X_train in [
+            sp.csr_array(self.X_dense),
+            sp.csc_array(self.X_dense),
+            sp.csr_matrix(self.X_dense),
+        ]:
+            with self.subTest(format=type(X_train).__name__):
+                reg = LADRegression()
+                reg.fit(X_train, self.y_train)
+                y_pred = reg.predict(X_train)
+                self.assertIsInstance(y_pred, np.ndarray)
+                self.assertEqual(y_pred.shape, (200,))
+                assert_allclose(y_pred, reg.predict(self.X_dense))
+                assert_allclose(np.abs(y_pred - self.y_train).sum(), error)
+
+
+class TestLADRegressionWarmStart(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.X_train = rng.random((60, 3))
+        self.y_train = self.X_train @ np.array([2.0, -1.0, 0.5]) + rng.normal(size=60)
+
+    def cold_error(self, X, y):
+        reg = LADRegression()
+        reg.fit(X, y)
+        return absolute_error(reg, X, y)
+
+    def test_append(self):
+        with LADRegression(chunk_size=7, warm_start=True) as reg:
+            reg.fit(self.X_train[:40], self.y_train[:40])
+            reg.refit(X_add=self.X_train[40:], y_add=self.y_train[40:])
+            assert_allclose(
+                absolute_error(reg, self.X_train, self.y_train),
+                self.cold_error(self.X_train, self.y_train),
+            )
+
+    def test_remove(self):
+        keep = np.ones(60, dtype=bool)
+        keep[[3, 17, 42]] = False
+        with LADRegression(warm_start=True) as reg:
+            reg.fit(self.X_train, self.y_train)
+            reg.refit(remove=np.array([3, 17, 42]))
+            assert_allclose(
+                absolute_error(reg, self.X_train[keep], self.y_train[keep]),
+                self.cold_error(self.X_train[keep], self.y_train[keep]),
+            )
+            # Boolean masks apply to the remaining records
+            reg.refit(remove=np.arange(57) < 7)
+            assert_allclose(
+                absolute_error(reg, self.X_train[keep][7:], self.y_train[keep][7:]),
+                self.cold_error(self.X_train[keep][7:], self.y_train[keep][7:]),
+            )
+
+    def test_update_outputs(self):
+        y_new = self.y_train[::-1].copy()
+        with LADRegression(warm_start=True) as reg:
+            reg.fit(self.X_train, self.y_train)
+            reg.refit(y_train=y_new)
+            assert_allclose(
+                absolute_error(reg, self.X_train, y_new),
+                self.cold_error(self.X_train, y_new),
+            )
+
+    def test_append_names(self):
+        with LADRegression(warm_start=True) as reg:
+            reg.fit(self.X_train[:40], self.y_train[:40])
+            reg.refit(remove=np.array([0]))
+            reg.refit(X_add=self.X_train[40:], y_add=self.y_train[40:])
+            names = reg._model.getAttr("ConstrName")
+        self.assertEqual(names, [f"fit[{i}]" for i in range(1, 60)])
+
+    def test_refit_options(self):
+        with LADRegression(warm_start=True) as reg:
+            reg.fit(self.X_train[:40], self.y_train[:40])
+            reg.refit(
+                X_add=self.X_train[40:],
+                y_add=self.y_train[40:],
+                solver_params={"IterationLimit": 0},
+            )
+            self.assertEqual(reg._model.Status, GRB.ITERATION_LIMIT)
+
+            # Options only apply to the call which set them
+            with tempfile.TemporaryDirectory() as tempdir:
+                logfile = os.path.join(tempdir, "refit.log")
+                reg.refit(logfile=logfile)
+                with open(logfile) as infile:
+                    self.assertIn("Optimal objective", infile.read())
+            self.assertEqual(reg._model.Status, GRB.OPTIMAL)
+            self.assertEqual(reg._model.Params.IterationLimit, float("inf"))
+
+    def test_not_warm(self):
+        reg = LADRegression()
+        reg.fit(self.X_train, self.y_train)
+        with self.assertRaises(ValueError):
+            reg.refit(y_train=self.y_train)
+
+    def test_close(self):
+        reg = LADRegression(warm_start=True)
+        reg.fit(self.X_train, self.y_train)
+        reg.close()
+        with self.assertRaises(ValueError):
+            reg.refit(y_train=self.y_train)
+        # Fitted coefficients remain available
+        self.assertEqual(reg.predict(self.X_train).shape, (60,))
+
+
+class TestLADRegressionPath(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.X_train = rng.random((80, 4))
+        self.y_train = self.X_train @ np.array([3.0, 0.0, -2.0, 0.1]) + rng.normal(
+            scale=0.1, size=80
+        )
+
+    def objective(self, coef, intercept, lam):
+        residuals = self.y_train - self.X_train @ coef - intercept
+        return np.abs(residuals).sum() + lam * np.abs(coef).sum()
+
+    def test_path(self):
+        lambdas = [50.0, 5.0, 0.5, 0.0]
+        reg = LADRegression()
+        coefs, intercepts = reg.fit_path(self.X_train, self.y_train, lambdas)
+        self.assertEqual(coefs.shape, (4, 4))
+        self.assertEqual(intercepts.shape, (4,))
+
+        # Regressor itself is not fitted
+        self.assertIsNone(reg.coef_)
+
+        # Large penalty zeros all coefficients
+        assert_allclose(coefs[0], 0.0, atol=1e-8)
+
+        # Each point on the path is optimal for its own penalty
+        for lam, coef, intercept in zip(lambdas, coefs, intercepts):
+            for other_coef, other_intercept in zip(coefs, intercepts):
+                self.assertLessEqual(
+                    self.objective(coef, intercept, lam),
+                    self.objective(other_coef, other_intercept, lam) + 1e-6,
+                )
+
+        # No penalty matches the unregularized fit
+        reg.fit(self.X_train, self.y_train)
+        assert_allclose(
+            self.objective(coefs[-1], intercepts[-1], 0.0),
+            self.objective(reg.coef_, reg.intercept_, 0.0),
+        )
+
+    def test_negative_lambda(self):
+        with self.assertRaises(ValueError):
+            LADRegression().fit_path(self.X_train, self.y_train, [1.0, -1.0])
+
+
+class TestLADRegressionDual(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.X_train = rng.random((120, 3))
+        self.y_train = self.X_train @ np.array([1.0, 2.0, 3.0]) + 5.0
+        self.y_train += rng.normal(size=120)
+        primal = LADRegression()
+        primal.fit(self.X_train, self.y_train)
+        self.error = absolute_error(primal, self.X_train, self.y_train)
+
+    def test_dual(self):
+        for chunk_size in [100_000, 17]:
+            with self.subTest(chunk_size=chunk_size):
+                reg = LADRegression(chunk_size=chunk_size, formulation="dual")
+                reg.fit(self.X_train, self.y_train)
+                self.assertEqual(reg.coef_.shape, (3,))
+                self.assertIsInstance(reg.intercept_, float)
+                assert_allclose(
+                    absolute_error(reg, self.X_train, self.y_train), self.error
+                )
+
+    def test_dual_sparse(self):
+        reg = LADRegression(chunk_size=50, formulation="dual")
+        reg.fit(sp.csc_array(self.X_train), self.y_train)
+        assert_allclose(absolute_error(reg, self.X_train, self.y_train), self.error)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            LADRegression(formulation="column")
+        with self.assertRaises(ValueError):
+            LADRegression(formulation="dual", warm_start=True)
+
+
+def pinball_loss(y_true, y_pred, tau):
+    residuals = y_true - y_pred
+    return np.maximum(tau * residuals, (tau - 1) * residuals).sum()
+
+
+class TestQuantileRegression(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.X_train = rng.random((100, 3))
+        self.y_train = self.X_train @ np.array([1.0, -1.0, 2.0]) + rng.exponential(
+            size=100
+        )
+
+    def test_median(self):
+        # Median regression has the same solutions as LAD
+        lad = LADRegression()
+        lad.fit(self.X_train, self.y_train)
+        reg = QuantileRegression(tau=0.5)
+        reg.fit(self.X_train, self.y_train)
+        assert_allclose(
+            absolute_error(reg, self.X_train, self.y_train),
+            absolute_error(lad, self.X_train, self.y_train),
+        )
+
+    def test_quantile(self):
+        reg = QuantileRegression(tau=0.9)
+        reg.fit(self.X_train, self.y_train)
+        self.assertEqual(reg.coef_.shape, (3,))
+        y_pred = reg.predict(self.X_train)
+        self.assertEqual(y_pred.shape, (100,))
+        # About 10% of records lie above the fitted quantile
+        self.assertLessEqual(np.sum(self.y_train > y_pred + 1e-8), 10)
+        self.assertGreaterEqual(np.sum(self.y_train >= y_pred - 1e-8), 10)
+
+    def test_multiple(self):
+        taus = [0.1, 0.5, 0.9]
+        for formulation in ["primal", "dual"]:
+            with self.subTest(formulation=formulation):
+                reg = QuantileRegression(tau=taus, formulation=formulation)
+                reg.fit(self.X_train, self.y_train)
+                self.assertEqual(reg.coef_.shape, (3, 3))
+                self.assertEqual(reg.intercept_.shape, (3,))
+                y_pred = reg.predict(self.X_train)
+                self.assertEqual(y_pred.shape, (100, 3))
+                for i, tau in enumerate(taus):
+                    single = QuantileRegression(tau=tau)
+                    single.fit(self.X_train, self.y_train)
+                    assert_allclose(
+                        pinball_loss(self.y_train, y_pred[:, i], tau),
+                        pinball_loss(self.y_train, single.predict(self.X_train), tau),
+                    )
+
+    def test_multiple_refit(self):
+        with QuantileRegression(tau=[0.25, 0.75], warm_start=True) as reg:
+            reg.fit(self.X_train[:70], self.y_train[:70])
+            reg.refit(X_add=self.X_train[70:], y_add=self.y_train[70:])
+            y_pred = reg.predict(self.X_train)
+        for i, tau in enumerate([0.25, 0.75]):
+            single = QuantileRegression(tau=tau)
+            single.fit(self.X_train, self.y_train)
+            assert_allclose(
+                pinball_loss(self.y_train, y_pred[:, i], tau),
+                pinball_loss(self.y_train, single.predict(self.X_train), tau),
+            )
+
+    def test_invalid(self):
+        for tau in [0.0, 1.0, [0.5, 1.5], []]:
+            with self.subTest(tau=tau):
+                with self.assertRaises(ValueError):
+                    QuantileRegression(tau=tau)
+        with self.assertRaises(ValueError):
+            QuantileRegression(tau=[0.2, 0.8]).fit_path(
+                self.X_train, self.y_train, [1.0]
+            )
+
+
+class TestRegressionFastBuild(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.X_train = rng.random((30, 3))
+        self.y_train = rng.random(30)
+
+    def test_fast_build(self):
+        for formulation in ["primal", "dual"]:
+            with self.subTest(formulation=formulation):
+                reg = LADRegression(formulation=formulation)
+                with recorded_names() as names:
+                    reg.fit(self.X_train, self.y_train, fast_build=True)
+                self.assertTrue(check_default_names(names))
+
+    def test_fast_build_path(self):
+        with recorded_names() as names:
+            LADRegression().fit_path(
+                self.X_train, self.y_train, [1.0, 0.0], fast_build=True
+            )
+        self.assertTrue(check_default_names(names))
+
+
+class TestRegressionPredict(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.X_train = rng.random((50, 4))
+        self.y_train = self.X_train @ np.array([1.0, 2.0, 0.0, -1.0]) + 0.5
+        self.X_test = rng.random((25, 4))
+        self.reg = LADRegression()
+        self.reg.fit(self.X_train, self.y_train)
+        self.expected = self.reg.predict(self.X_test)
+
+    def test_out(self):
+        out = np.empty(25)
+        for X_test in [self.X_test, sp.csr_array(self.X_test)]:
+            with self.subTest(format=type(X_test).__name__):
+                out[:] = np.nan
+                y_pred = self.reg.predict(X_test, out=out)
+                self.assertIs(y_pred, out)
+                assert_allclose(out, self.expected)
+
+    def test_out_multiple(self):
+        reg = QuantileRegression(tau=[0.25, 0.75])
+        reg.fit(self.X_train, self.y_train)
+        out = np.empty((25, 2))
+        reg.predict(self.X_test, out=out)
+        assert_allclose(out, reg.predict(self.X_test))
+
+    def test_batches(self):
+        batches = (self.X_test[i : i + 10] for i in range(0, 25, 10))
+        y_pred = np.concatenate(list(self.reg.predict_batches(batches)))
+        assert_allclose(y_pred, self.expected)
+
+    def test_batches_out(self):
+        out = np.empty(10)
+        batches = (self.X_test[i : i + 10] for i in range(0, 25, 10))
+        y_pred = []
+        for batch_pred in self.reg.predict_batches(batches, out=out):
+            self.assertIs(batch_pred.base, out)
+            y_pred.append(batch_pred.copy())
+        assert_allclose(np.concatenate(y_pred), self.expected)
@@ -4,17 +4,21 @@ found in tests/utils.py
 """
 
 import io
+import logging
 import os
+import re
 import tempfile
 import unittest
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import redirect_stderr, redirect_stdout
 from pathlib import Path
+from unittest import mock
 
 import gurobipy as gp
 from gurobipy import GRB
 
-from gurobi_optimods.utils import optimod
+from gurobi_optimods.utils import EnvPool, names_enabled, optimod
 
 
 class TestOptimodDecorator(unittest.TestCase):
@@ -104,3 +108,166 @@ class TestOverrideParams(unittest.TestCase):
                 assert model.Status == GRB.WORK_LIMIT
 
         mod(solver_params={"WorkLimit": 0.0})
+
+
+class TestEnvPool(unittest.TestCase):
+    def setUp(self):
+        self.envs = []
+
+        @optimod()
+        def mod(*, create_env):
+            with create_env() as env, gp.Model(env=env) as model:
+                self.envs.append(env)
+                model.optimize()
+                return model.Status
+
+        self.mod = mod
+
+    def test_reuse(self):
+        # Repeated calls with the same parameters share an environment
+
+        with EnvPool() as pool:
+            for _ in range(3):
+                self.mod(verbose=False, env_pool=pool)
+
+        self.assertEqual(len(self.envs), 3)
+        self.assertIs(self.envs[0], self.envs[1])
+        self.assertIs(self.envs[0], self.envs[2])
+
+    def test_keyed_by_params(self):
+        # Different parameters are never served by the same environment
+
+        with EnvPool() as pool:
+            self.mod(verbose=False, env_pool=pool)
+            status = self.mod(
+                verbose=False, solver_params={"WorkLimit": 0.0}, env_pool=pool
+            )
+            self.mod(verbose=False, env_pool=pool)
+
+        self.assertEqual(status, GRB.WORK_LIMIT)
+        self.assertIsNot(self.envs[0], self.envs[1])
+        self.assertIs(self.envs[0], self.envs[2])
+
+    def test_reset_params(self):
+        # Parameter changes made by a mod do not leak into the next call
+
+        @optimod()
+        def mod(*, create_env):
+            with create_env() as env, gp.Model(env=env) as model:
+                env.setParam("WorkLimit", 0.0)
+                model.optimize()
+
+        with EnvPool() as pool:
+            mod(verbose=False, env_pool=pool)
+            status = self.mod(verbose=False, env_pool=pool)
+
+        self.assertEqual(status, GRB.OPTIMAL)
+
+    def test_not_verbose(self):
+        # Pooled environments respect verbose=False
+
+        with EnvPool() as pool, redirect_stdout(
+            io.StringIO()
+        ) as buffer_stdout, redirect_stderr(io.StringIO()) as buffer_stderr:
+            self.mod(verbose=False, env_pool=pool)
+            self.mod(verbose=False, env_pool=pool)
+
+        self.assertEqual(buffer_stdout.getvalue(), "")
+        self.assertEqual(buffer_stderr.getvalue(), "")
+
+    def test_closed(self):
+        pool = EnvPool()
+        pool.close()
+        with self.assertRaises(RuntimeError):
+            self.mod(verbose=False, env_pool=pool)
+
+
+class TestConcurrentLogging(unittest.TestCase):
+    def test_logfiles(self):
+        # Mods running in parallel threads each log to their own file
+
+        logger = logging.getLogger("gurobi_optimods.test_utils")
+
+        @optimod()
+        def mod(i, *, create_env):
+            with create_env() as env, gp.Model(env=env) as model:
+                x = model.addVars(10, ub=i + 1, obj=-1.0)
+                for _ in range(20):
+                    logger.info(f"message from mod {i}")
+                model.optimize()
+                return model.ObjVal
+
+        with tempfile.TemporaryDirectory() as tempdir, redirect_stdout(io.StringIO()):
+            logfiles = [os.path.join(tempdir, f"mod{i}.log") for i in range(8)]
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                futures = [
+                    executor.submit(mod, i, logfile=logfile)
+                    for i, logfile in enumerate(logfiles)
+                ]
+                results = [future.result() for future in futures]
+            logfile_texts = [Path(logfile).read_text() for logfile in logfiles]
+
+        self.assertEqual(results, [-10.0 * (i + 1) for i in range(8)])
+        for i, text in enumerate(logfile_texts):
+            self.assertEqual(text.count("message from mod"), 20)
+            self.assertEqual(text.count(f"message from mod {i}"), 20)
+            self.assertIn("Gurobi Optimizer", text)
+            objective = re.escape(f"{-10.0 * (i + 1):.9e}")
+            self.assertRegex(text, rf"Optimal objective\s+{objective}")
+
+    def test_no_handler_leak(self):
+        # Handlers are only active for the duration of the call
+
+        @optimod()
+        def mod(*, create_env):
+            with create_env() as env, gp.Model(env=env) as model:
+                model.optimize()
+
+        with tempfile.TemporaryDirectory() as tempdir, redirect_stdout(io.StringIO()):
+            logfile = os.path.join(tempdir, "tmp.log")
+            # The first call installs the context handlers
+            mod(verbose=False)
+            handlers = list(logging.getLogger("gurobipy").handlers)
+            mod(logfile=logfile)
+            self.assertEqual(logging.getLogger("gurobipy").handlers, handlers)
+
+    def test_last_resort(self):
+        # Warnings logged outside of a mod still reach stderr (through
+        # logging.lastResort) once the context handlers are installed
+
+        @optimod()
+        def mod(*, create_env):
+            with create_env() as env, gp.Model(env=env) as model:
+                model.optimize()
+
+        mod(verbose=False)
+        root = logging.getLogger()
+        for name in ["gurobipy", "gurobi_optimods.test_utils"]:
+            # Test runners may attach handlers to the root logger
+            with mock.patch.object(root, "handlers", []), redirect_stderr(
+                io.StringIO()
+            ) as buffer_stderr:
+                logging.getLogger(name).warning("unrouted warning")
+                logging.getLogger(name).info("unrouted info")
+            self.assertEqual(buffer_stderr.getvalue(), "unrouted warning\n")
+
+
+class TestFastBuild(unittest.TestCase):
+    def setUp(self):
+        @optimod()
+        def mod(*, create_env):
+            with create_env() as env, gp.Model(env=env) as model:
+                names = names_enabled()
+                model.addMVar(3, name="x" if names else None)
+                model.update()
+                return model.VarName
+
+        self.mod = mod
+
+    def test_default(self):
+        self.assertEqual(self.mod(verbose=False), ["x[0]", "x[1]", "x[2]"])
+
+    def test_fast_build(self):
+        self.assertEqual(self.mod(verbose=False, fast_build=True), ["C0", "C1", "C2"])
+        # Only active for the duration of the call
+        self.assertTrue(names_enabled())
@@ -9,6 +9,8 @@ from pandas.testing import assert_frame_equal
 from gurobi_optimods.workforce import solve_workforce_scheduling
 from gurobi_optimods.datasets import load_workforce
 
+from .utils import check_default_names, recorded_names
+
 
 def read_csv(text):
     return pd.read_csv(StringIO(dedent(text)))
@@ -264,6 +266,65 @@ class TestWorkforceScheduling(unittest.TestCase):
             expected,
         )
 
+    def test_rolling_limits_fast_build(self):
+        # Same solution when the model is built without names
+
+        preferences = read_csv(
+            """
+            Worker,Shift,Preference
+            Alice,2022-07-01,1.0
+            Alice,2022-07-02,2.0
+            Alice,2022-07-03,3.0
+            Alice,2022-07-04,4.0
+            Bob,2022-07-01,5.1
+            Bob,2022-07-02,6.2
+            Bob,2022-07-03,7.3
+            Bob,2022-07-04,8.4
+            """
+        ).assign(Shift=lambda df: pd.to_datetime(df["Shift"]))
+        shift_requirements = read_csv(
+            """
+            Shift,Required
+            2022-07-01,1
+            2022-07-02,1
+            2022-07-03,1
+            2022-07-04,1
+            """
+        ).assign(Shift=lambda df: pd.to_datetime(df["Shift"]))
+        worker_limits = read_csv(
+            """
+            Worker,Window,MinShifts,MaxShifts
+            Alice,2D,0,1
+            Bob,2D,0,1
+            """
+        ).assign(Window=lambda df: pd.to_timedelta(df["Window"]))
+
+        with recorded_names() as names:
+            assignments = solve_workforce_scheduling(
+                preferences=preferences,
+                shift_requirements=shift_requirements,
+                worker_limits=worker_limits,
+                rolling_limits=True,
+                fast_build=True,
+            )
+        self.assertTrue(check_default_names(names))
+
+        expected = read_csv(
+            """
+            Worker,Shift,Preference
+            Alice,2022-07-01,1.0
+            Bob,2022-07-02,6.2
+            Alice,2022-07-03,3.0
+            Bob,2022-07-04,8.4
+            """
+        ).assign(Shift=lambda df: pd.to_datetime(df["Shift"]))
+        self.assertIsInstance(assignments, pd.DataFrame)
+        self.assertIsNot(assignments, preferences)
+        assert_frame_equal(
+            assignments.sort_values(["Shift"]).reset_index(drop=True),
+            expected,
+        )
+
     def test_infeasibility(self):
         # Infeasibility should raise an exception
 
@@ -4,7 +4,10 @@ found in tests/test_utils.py
 """
 
 import functools
+import re
 import unittest
+from contextlib import contextmanager
+from unittest import mock
 
 import gurobipy as gp
 from gurobipy import GRB
@@ -27,3 +30,30 @@ def large_model(test_item):
             raise
 
     return skip_wrapper
+
+
+@contextmanager
+def recorded_names():
+    """Record the variable and constraint names of every model solved within
+    the context. Yields a list which receives one (variable names, constraint
+    names) pair per call to Model.optimize."""
+    names = []
+    optimize = gp.Model.optimize
+
+    def record(model, *args, **kwargs):
+        model.update()
+        names.append((model.getAttr("VarName"), model.getAttr("ConstrName")))
+        return optimize(model, *args, **kwargs)
+
+    with mock.patch.object(gp.Model, "optimize", record):
+        yield names
+
+
+def check_default_names(names):
+    """Check that at least one model was recorded, and that all recorded
+    models kept Gurobi's default names (C0, C1, ... and R0, R1, ...)"""
+    return bool(names) and all(
+        all(re.fullmatch(r"C\d+", name) for name in var_names)
+        and all(re.fullmatch(r"R\d+", name) for name in constr_names)
+        for var_names, constr_names in names
+    )